@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+import heapq
+import multiprocessing
+import os
 import re
+from itertools import islice
 
 ELEMENTS = {
     'ac': 'actinium',
@@ -123,49 +127,244 @@ ELEMENTS = {
     'zr': 'zirconium'
 }
 
-def elements(word):
+# Element symbols in order of atomic number.
+PERIODIC_TABLE = '''
+h he li be b c n o f ne na mg al si p s cl ar k ca sc ti v cr mn fe co ni cu zn ga ge as se br kr
+rb sr y zr nb mo tc ru rh pd ag cd in sn sb te i xe cs ba la ce pr nd pm sm eu gd tb dy ho er tm yb
+lu hf ta w re os ir pt au hg tl pb bi po at rn fr ra ac th pa u np pu am cm bk cf es fm md no lr rf
+db sg bh hs mt ds rg cn nh fl mc lv ts og
+'''.split()
+
+ATOMIC_NUMBERS = {symbol: number for (number, symbol) in enumerate(PERIODIC_TABLE, 1)}
+
+# Cost of each symbol for ranking breakdowns.
+COSTS = {
+    'symbols': lambda symbol: 1,
+    'atomic': lambda symbol: ATOMIC_NUMBERS[symbol]
+}
+
+SYMBOL_LENGTHS = sorted(set(len(symbol) for symbol in ELEMENTS))
+SCAN_CHUNK_SIZE = 512
+
+def elements(word, count_only=False, cost=None, top=None, unique=False):
     '''Tries to break down the given word into a list of chemical element symbols.
-    Non-alphabetic characters are ignored. There may be multiple solutions.'''
+    Non-alphabetic characters are ignored. There may be multiple solutions.
+    If a cost is given, only the top solutions with the lowest cost are printed.'''
     letters = ''.join(re.findall('[a-z]+', word.lower()))
     if len(letters) == 0:
         print('Please enter a word with at least one letter.')
         return
-    solutions = elements_helper([], letters)
-    count = len(solutions)
+    (counts, choices) = segmentation_lattice(letters)
+    count = counts[0]
     print('Found {0} solution{1} for "{2}".'.format(count, '' if count == 1 else 's', word))
-    for solution in solutions:
-        symbols = ', '.join([symbol.capitalize() for symbol in solution])
-        element_names = ', '.join([ELEMENTS[symbol].capitalize() for symbol in solution])
-        print('{0} ({1})'.format(symbols, element_names))
-
-def elements_helper(partial_list, partial_word):
-    '''Recursive helper function for the elements function.'''
-    result = []
-    if len(partial_word) > 0 and partial_word[0] in ELEMENTS.keys():
-        new_list = partial_list + [partial_word[0]]
-        if len(partial_word) == 1:
-            result.append(new_list)
-        else:
-            result.extend(elements_helper(new_list, partial_word[1:]))
-    if len(partial_word) > 1 and partial_word[:2] in ELEMENTS.keys():
-        new_list = partial_list + [partial_word[:2]]
-        if len(partial_word) == 2:
-            result.append(new_list)
+    if count_only:
+        return
+    if cost is None and not unique:
+        for solution in islice(segmentations(letters, (counts, choices)), top):
+            print(format_solution(solution))
+        return
+    cost = cost or 'symbols'
+    print('Best solutions by {0}{1}:'.format(cost, ' without repeated elements' if unique else ''))
+    for (total, solution) in islice(ranked_segmentations(letters, cost, unique, (counts, choices)), top):
+        print('{0} [{1}]'.format(format_solution(solution), total))
+
+def format_solution(solution):
+    '''Returns the symbols and element names of the given solution as a string.'''
+    symbols = ', '.join([symbol.capitalize() for symbol in solution])
+    element_names = ', '.join([ELEMENTS[symbol].capitalize() for symbol in solution])
+    return '{0} ({1})'.format(symbols, element_names)
+
+def segmentation_lattice(letters):
+    '''Works backwards through the given letters to find, for each position,
+    the number of ways the rest of the letters can be broken down into element
+    symbols and the symbols starting there that lead to a complete breakdown.
+    Returns both lists, each with one entry per position plus one for the end.'''
+    length = len(letters)
+    counts = [0] * (length + 1)
+    choices = [[] for _ in range(length + 1)]
+    counts[length] = 1
+    for position in range(length - 1, -1, -1):
+        for symbol_length in SYMBOL_LENGTHS:
+            end = position + symbol_length
+            if end > length or counts[end] == 0:
+                continue
+            symbol = letters[position:end]
+            if symbol in ELEMENTS:
+                counts[position] += counts[end]
+                choices[position].append(symbol)
+    return (counts, choices)
+
+def count_segmentations(letters):
+    '''Returns the number of ways the given letters can be broken down into
+    element symbols, without listing them.'''
+    return segmentation_lattice(letters)[0][0]
+
+def segmentations(letters, lattice=None):
+    '''Lazily yields each breakdown of the given letters into element symbols
+    as a tuple. Since every choice in the lattice leads to a complete breakdown,
+    no work is wasted on dead ends and the solutions share their suffixes.'''
+    (counts, choices) = lattice or segmentation_lattice(letters)
+    if counts[0] == 0:
+        return
+    length = len(letters)
+    path = []
+    positions = [0]
+    iterators = [iter(choices[0])]
+    while iterators:
+        symbol = next(iterators[-1], None)
+        if symbol is None:
+            iterators.pop()
+            positions.pop()
+            if path:
+                path.pop()
+            continue
+        path.append(symbol)
+        position = positions[-1] + len(symbol)
+        if position == length:
+            yield tuple(path)
+            path.pop()
+            continue
+        positions.append(position)
+        iterators.append(iter(choices[position]))
+
+def minimum_costs(letters, cost, lattice=None):
+    '''Works backwards through the segmentation lattice of the given letters to
+    find, for each position, the lowest cost of breaking down the rest of the
+    letters and the symbol that starts that cheapest breakdown.'''
+    (counts, choices) = lattice or segmentation_lattice(letters)
+    symbol_cost = COSTS[cost]
+    length = len(letters)
+    lowest = [0] * (length + 1)
+    best_choice = [None] * (length + 1)
+    for position in range(length - 1, -1, -1):
+        for symbol in choices[position]:
+            total = symbol_cost(symbol) + lowest[position + len(symbol)]
+            if best_choice[position] is None or total < lowest[position]:
+                lowest[position] = total
+                best_choice[position] = symbol
+    return (lowest, best_choice)
+
+def fewest_symbols(letters, lattice=None):
+    '''Returns a breakdown of the given letters that uses as few element symbols
+    as possible, or None if there is no breakdown.'''
+    lattice = lattice or segmentation_lattice(letters)
+    if lattice[0][0] == 0:
+        return None
+    (_, best_choice) = minimum_costs(letters, 'symbols', lattice)
+    length = len(letters)
+    solution = []
+    position = 0
+    while position < length:
+        solution.append(best_choice[position])
+        position += len(best_choice[position])
+    return tuple(solution)
+
+def ranked_segmentations(letters, cost='symbols', unique=False, lattice=None):
+    '''Lazily yields (total cost, breakdown) pairs for the given letters from the
+    lowest total cost up, where cost is one of the keys of COSTS. If unique is
+    True, breakdowns that use an element more than once are skipped.
+
+    This is a best-first search over the segmentation lattice, where partial
+    breakdowns are ordered by their cost so far plus the lowest cost of
+    finishing them. For plain costs that estimate is exact, so each breakdown
+    takes about one heap operation per symbol and nothing past the last
+    requested breakdown is ever built.'''
+    lattice = lattice or segmentation_lattice(letters)
+    (counts, choices) = lattice
+    if counts[0] == 0:
+        return
+    (lowest, _) = minimum_costs(letters, cost, lattice)
+    symbol_cost = COSTS[cost]
+    length = len(letters)
+    # Partial breakdowns are linked lists of (symbol, previous) so they share prefixes.
+    # Ties go to the most recently pushed breakdown, which keeps the search depth
+    # first (and in lattice order) among the many breakdowns of equal cost.
+    heap = [(lowest[0], 0, 0, 0, None)]
+    counter = -1
+    while heap:
+        (estimate, _, total, position, path) = heapq.heappop(heap)
+        if position == length:
+            solution = []
+            while path:
+                (symbol, path) = path
+                solution.append(symbol)
+            yield (total, tuple(reversed(solution)))
+            continue
+        for symbol in reversed(choices[position]):
+            if unique and _path_contains(path, symbol):
+                continue
+            end = position + len(symbol)
+            new_total = total + symbol_cost(symbol)
+            heapq.heappush(heap, (new_total + lowest[end], counter, new_total, end, (symbol, path)))
+            counter -= 1
+
+def _path_contains(path, symbol):
+    while path:
+        if path[0] == symbol:
+            return True
+        path = path[1]
+    return False
+
+def spellability(word):
+    '''Returns the given word, its number of breakdowns into element symbols
+    and its breakdown with the fewest symbols (None if there are no breakdowns).'''
+    letters = ''.join(re.findall('[a-z]+', word.lower()))
+    if len(letters) == 0:
+        return (word, 0, None)
+    lattice = segmentation_lattice(letters)
+    return (word, lattice[0][0], fewest_symbols(letters, lattice))
+
+def scan_word_list(path, processes=1):
+    '''Prints each word in the given file (one per line) that can be broken
+    down into element symbols, followed by its number of breakdowns and its
+    breakdown with the fewest symbols, separated by tabs.'''
+    with open(path) as word_file:
+        words = (line.strip() for line in word_file if line.strip())
+        if processes > 1:
+            with multiprocessing.Pool(processes) as pool:
+                print_spellable(pool.imap(spellability, words, chunksize=SCAN_CHUNK_SIZE))
         else:
-            result.extend(elements_helper(new_list, partial_word[2:]))
-    return result
+            print_spellable(map(spellability, words))
+
+def print_spellable(results):
+    '''Prints the spellable words from the given spellability results.'''
+    for (word, count, solution) in results:
+        if count > 0:
+            print('{0}\t{1}\t{2}'.format(word, count, ''.join([symbol.capitalize() for symbol in solution])))
+
+def non_negative_int(value):
+    '''Argument type for options that take a count of zero or more.'''
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid int value: \'{0}\''.format(value))
+    if number < 0:
+        raise argparse.ArgumentTypeError('must be zero or more: {0}'.format(value))
+    return number
 
 def create_parser():
     '''Creates and returns the argument parser for this script.'''
     parser = argparse.ArgumentParser(description = 'Determines if a given word can be broken down into chemical element symbols.')
-    parser.add_argument('word', type=str, help='The word to try to break down into chemical element symbols.')
+    parser.add_argument('word', type=str, nargs='?', help='The word to try to break down into chemical element symbols.')
+    parser.add_argument('-c', '--count', action='store_true', help='Only print the number of solutions.')
+    parser.add_argument('-r', '--rank', dest='cost', default=None, choices=sorted(COSTS), help='Print solutions from the lowest total cost up: the fewest symbols or the lowest total atomic number.')
+    parser.add_argument('-u', '--unique', action='store_true', help='Only print solutions that do not repeat an element.')
+    parser.add_argument('-k', '--top', dest='top', default=None, type=non_negative_int, help='Only print the first TOP solutions.')
+    parser.add_argument('-f', '--file', dest='path', default=None, type=str, help='Scan a word list (one word per line) and print each word that can be broken down, with its number of solutions and the solution with the fewest symbols.')
+    parser.add_argument('-p', '--processes', dest='processes', default=1, type=int, help='Number of processes to use for --file. Use 0 for one per CPU.')
     return parser
 
 def main():
     parser = create_parser()
     args = parser.parse_args()
+    if args.path:
+        processes = args.processes if args.processes > 0 else os.cpu_count()
+        scan_word_list(args.path, processes)
+        return
     word = args.word
-    elements(word)
+    if word is None:
+        parser.error('a word is required unless --file is given')
+    elements(word, args.count, args.cost, args.top, args.unique)
 
 if __name__ == "__main__":
     main()
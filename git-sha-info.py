@@ -1,103 +1,217 @@
 #!/usr/bin/env python
 import argparse
+import binascii
+import mmap
+import os
+import struct
 import subprocess
-from collections import defaultdict
-
-def analyze_digit_frequency(sha_list):
-    '''Calculates how many times each hex digit appears in the given
-    list of commit hashes.'''
-    frequency_dict = defaultdict(int)
-    for sha in sha_list:
-        for digit in sha:
-            frequency_dict[digit] += 1
-    sum_digits = float(sum(frequency_dict.values()))
-    print('Digit   Occurrences   Frequency')
-    print('-----   -----------   ---------')
-    for digit, occurrences in sorted(frequency_dict.items(), key=lambda t: (t[1], t[0])):
-        percent = (occurrences / sum_digits) * 100
-        print('{0}       {1}   {2:.3f} %'.format(digit, str(occurrences).ljust(11), percent))
-    print('\nTotal digits: {0}'.format(int(sum_digits)))
-
-def find_longest_letter_string_in_list(string_list):
-    '''Finds the longest substring of consecutive alphabetical
-    characters in the given list of strings.'''
-    longest_letter_string_list = []
-    for string in string_list:
-        longest_letter_string_list.append(find_longest_letter_string(string))
-    longest_letter_string_length = 0
-    for longest_letter_string in longest_letter_string_list:
-        if len(longest_letter_string) > longest_letter_string_length:
-            longest_letter_string_length = len(longest_letter_string)
-    print('The longest string of only letters is {0} letters long:'.format(longest_letter_string_length))
-    for (index, longest_letter_string) in enumerate(longest_letter_string_list):
-        if len(longest_letter_string) == longest_letter_string_length:
-            print('{0}, in {1}'.format(longest_letter_string, string_list[index]))
-
-def find_longest_letter_string(string):
-    '''Finds the longest substring of consecutive alphabetical
-    characters in the given string.'''
-    start_pos = 0
-    max_length = 0
-    current_length = 0
-    for i in range(0, len(string) + 1):
-        if i < len(string) and string[i].isalpha():
-            current_length += 1
-        else:
-            if current_length > max_length:
-                max_length = current_length
-                start_pos = i - current_length
-            current_length = 0
-    if max_length > 0:
-        return string[start_pos:start_pos + max_length]
-    else:
-        return ''
-
-def find_longest_repeating_char_in_list(string_list):
-    '''Finds the longest substring of consecutive repeated characters
-    in the given list of strings.'''
-    longest_repeating_char_list = []
-    for string in string_list:
-        longest_repeating_char_list.append(find_longest_repeating_char(string))
-    longest_repeating_char_length = 0
-    for longest_repeating_char in longest_repeating_char_list:
-        if len(longest_repeating_char) > longest_repeating_char_length:
-            longest_repeating_char_length = len(longest_repeating_char)
-    print('The longest sequence of repeated digits is {0} digits long:'.format(longest_repeating_char_length))
-    for (index, longest_repeating_char) in enumerate(longest_repeating_char_list):
-        if len(longest_repeating_char) == longest_repeating_char_length:
-            print('{0}, in {1}'.format(longest_repeating_char, string_list[index]))
-
-def find_longest_repeating_char(string):
-    '''Finds the longest substring of consecutive repeated characters
-    in the given string.'''
-    i = 0
-    sub_string = string[1]
-    longest_repeating_char = ''
-    while i < len(string) - 1:
-        if string[i] == string[i + 1]:
-            sub_string += string[i + 1]
-        else:
-            if len(sub_string) > len(longest_repeating_char):
-                longest_repeating_char = sub_string
-            sub_string = string[i + 1]
-        i += 1
-    return longest_repeating_char
-
-def find_word(sha_list, word):
-    '''Finds all commit hashes in the given list that contain the given word.'''
-    valid_word = validate_word(word)
-    word_sha_list = []
-    if valid_word:
-        for sha in sha_list:
-            if word.lower() in sha:
-                word_sha_list.append(sha)
-    s = 's' if len(word_sha_list) == 1 else ''
-    print('{0} of your commit hashes contain{1} {2}'.format(len(word_sha_list), s, word.lower()))
-    for word_sha in word_sha_list[:10]:
-        print(word_sha)
-    if len(word_sha_list) > 10:
-        print('...Just to name a few.')
-        
+import zlib
+from itertools import chain, islice
+
+import numpy as np
+
+SHA_LENGTH = 40
+SHA_RECORD_SIZE = SHA_LENGTH + 1
+OBJECT_ID_SIZE = 20
+ANALYSIS_CHUNK_SIZE = 1 << 16
+
+# Maps ASCII hex digits to their values.
+HEX_VALUES = np.zeros(256, dtype=np.uint8)
+for (value, digit) in enumerate('0123456789abcdef'):
+    HEX_VALUES[ord(digit)] = value
+    HEX_VALUES[ord(digit.upper())] = value
+
+# Object types as stored in pack files.
+OBJ_COMMIT = 1
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+def analyze(chunks, accumulators, separator=None):
+    '''Feeds every (shas, nibbles) chunk to every accumulator in a single pass,
+    then prints each accumulator's report in order (with the separator
+    printed between them, if given). In each chunk, nibbles is an N x 40
+    array of hex digit values and shas is a sequence of the same N hashes as
+    strings. Accumulators use vectorized array operations on the
+    nibbles and only look up the strings they report. To add a new
+    statistic, write a class with add(shas, nibbles) and report() methods
+    and pass an instance here.'''
+    for (shas, nibbles) in chunks:
+        for accumulator in accumulators:
+            accumulator.add(shas, nibbles)
+    for (index, accumulator) in enumerate(accumulators):
+        if index > 0 and separator is not None:
+            print(separator)
+        accumulator.report()
+
+def iter_sha_chunks(sha_list):
+    '''Reads the hex hashes in the given iterable in chunks and yields each
+    chunk with its nibbles.'''
+    sha_list = iter(sha_list)
+    while True:
+        shas = list(islice(sha_list, ANALYSIS_CHUNK_SIZE))
+        if not shas:
+            break
+        yield (shas, to_nibbles(shas))
+
+def to_nibbles(shas):
+    '''Returns the given hex hashes as an array of digit values, one row per hash.'''
+    characters = np.frombuffer(''.join(shas).encode('ascii'), dtype=np.uint8)
+    return HEX_VALUES[characters].reshape(len(shas), -1)
+
+def object_ids_to_nibbles(object_ids):
+    '''Returns the given N x 20 array of raw object IDs as an N x 40 array of
+    hex digit values.'''
+    nibbles = np.empty((len(object_ids), SHA_LENGTH), dtype=np.uint8)
+    nibbles[:, 0::2] = object_ids >> 4
+    nibbles[:, 1::2] = object_ids & 15
+    return nibbles
+
+class HexObjectIds(object):
+    '''A sequence of hex strings for an N x 20 array of raw object IDs, which
+    only converts the IDs that are looked up.'''
+
+    def __init__(self, object_ids):
+        self.object_ids = object_ids
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    def __getitem__(self, index):
+        return decode_bytes_if_necessary(binascii.hexlify(self.object_ids[index].tobytes()))
+
+def longest_runs(mask):
+    '''Returns the start and length of the first longest run of True values
+    in each row of the given 2D boolean array. The columns are scanned one at
+    a time, each as a single operation over every row.'''
+    columns = np.ascontiguousarray(mask.T)
+    run = np.zeros(len(mask), dtype=np.int8)
+    lengths = np.zeros(len(mask), dtype=np.int8)
+    ends = np.zeros(len(mask), dtype=np.int8)
+    for (column, values) in enumerate(columns):
+        run += 1
+        run *= values
+        np.copyto(ends, column, where=run > lengths)
+        np.maximum(lengths, run, out=lengths)
+    return (ends - lengths + 1, lengths)
+
+def longest_letter_runs(nibbles):
+    '''Returns the start and length of the longest string of only letters
+    in each row of nibbles.'''
+    return longest_runs(nibbles >= 10)
+
+def longest_digit_runs(nibbles):
+    '''Returns the start and length of the longest string of only numbers
+    in each row of nibbles.'''
+    return longest_runs(nibbles < 10)
+
+def longest_repeating_runs(nibbles):
+    '''Returns the start and length of the longest sequence of repeated digits
+    in each row of nibbles. As in earlier versions of this script, a sequence
+    only counts once a different digit follows it.'''
+    # equal[i] is True where digit i is the same as digit i + 1.
+    equal = np.ascontiguousarray((nibbles[:, 1:] == nibbles[:, :-1]).T)
+    sequence = np.zeros(nibbles.shape[0], dtype=np.int8)
+    lengths = np.zeros(nibbles.shape[0], dtype=np.int8)
+    ends = np.zeros(nibbles.shape[0], dtype=np.int8)
+    for (column, same_as_next) in enumerate(equal):
+        # Length of the sequence ending at this digit.
+        sequence += 1
+        # It only counts if the next digit is different.
+        candidate = sequence * ~same_as_next
+        np.copyto(ends, column, where=candidate > lengths)
+        np.maximum(lengths, candidate, out=lengths)
+        sequence *= same_as_next
+    starts = np.where(ends == 0, 1, ends - lengths + 1)
+    return (starts, lengths)
+
+class DigitFrequency(object):
+    '''Counts how many times each hex digit appears in the hashes.'''
+
+    def __init__(self):
+        self.counts = np.zeros(16, dtype=np.int64)
+
+    def add(self, shas, nibbles):
+        self.counts += np.bincount(nibbles.ravel(), minlength=16)
+
+    def report(self):
+        frequency_dict = dict(('{0:x}'.format(value), int(occurrences)) for (value, occurrences) in enumerate(self.counts) if occurrences)
+        sum_digits = float(sum(frequency_dict.values()))
+        print('Digit   Occurrences   Frequency')
+        print('-----   -----------   ---------')
+        for digit, occurrences in sorted(frequency_dict.items(), key=lambda t: (t[1], t[0])):
+            percent = (occurrences / sum_digits) * 100
+            print('{0}       {1}   {2:.3f} %'.format(digit, str(occurrences).ljust(11), percent))
+        print('\nTotal digits: {0}'.format(int(sum_digits)))
+
+class LongestSubstring(object):
+    '''Keeps the longest substring found in the hashes by the given vectorized
+    function, along with every hash where a substring of that length was
+    found. The function takes an array of nibbles and returns the start and
+    length of a substring in each row. The heading is formatted with the
+    length of the longest substring.'''
+
+    def __init__(self, find_runs, heading):
+        self.find_runs = find_runs
+        self.heading = heading
+        self.longest_length = 0
+        self.matches = []
+
+    def add(self, shas, nibbles):
+        (starts, lengths) = self.find_runs(nibbles)
+        chunk_longest = int(lengths.max())
+        if chunk_longest > self.longest_length:
+            self.longest_length = chunk_longest
+            self.matches = []
+        if chunk_longest == self.longest_length:
+            for row in np.flatnonzero(lengths == chunk_longest):
+                start = int(starts[row])
+                self.matches.append((shas[row][start:start + chunk_longest], shas[row]))
+
+    def report(self):
+        print(self.heading.format(self.longest_length))
+        for (substring, sha) in self.matches:
+            print('{0}, in {1}'.format(substring, sha))
+
+class WordSearch(object):
+    '''Counts the hashes that contain the given word, keeping the first few.'''
+
+    def __init__(self, word):
+        self.word = word.lower()
+        self.valid_word = validate_word(word)
+        self.word_nibbles = HEX_VALUES[bytearray(self.word.encode('ascii'))] if self.valid_word else None
+        self.word_sha_count = 0
+        self.word_sha_list = []
+
+    def add(self, shas, nibbles):
+        if not self.valid_word:
+            return
+        # Compare the word against every position in every hash at once.
+        positions = nibbles.shape[1] - len(self.word_nibbles) + 1
+        found = np.ones((len(nibbles), positions), dtype=bool)
+        for (offset, value) in enumerate(self.word_nibbles):
+            found &= nibbles[:, offset:offset + positions] == value
+        rows = np.flatnonzero(found.any(axis=1))
+        for row in rows[:10 - len(self.word_sha_list)]:
+            self.word_sha_list.append(shas[row])
+        self.word_sha_count += len(rows)
+
+    def report(self):
+        s = 's' if self.word_sha_count == 1 else ''
+        print('{0} of your commit hashes contain{1} {2}'.format(self.word_sha_count, s, self.word))
+        for word_sha in self.word_sha_list:
+            print(word_sha)
+        if self.word_sha_count > 10:
+            print('...Just to name a few.')
+
+def longest_letter_string_accumulator():
+    return LongestSubstring(longest_letter_runs, 'The longest string of only letters is {0} letters long:')
+
+def longest_digit_string_accumulator():
+    return LongestSubstring(longest_digit_runs, 'The longest string of only numbers is {0} digits long:')
+
+def longest_repeating_char_accumulator():
+    return LongestSubstring(longest_repeating_runs, 'The longest sequence of repeated digits is {0} digits long:')
+
 def validate_word(word):
     '''Checks if the given word is a valid hex word that could appear
     in a commit hash.'''
@@ -109,20 +223,210 @@ def validate_word(word):
             return False
     return True
 
-def get_sha_list(path):
-    '''Returns a list of the git commit hashes in the given directory
-    in the form of string representations of base-16 numbers.'''
-    pop = subprocess.Popen(['git', '-C', path, 'log', '--pretty=format:"%H"', '--encoding=UTF-8'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    output, error = pop.communicate()
+def iter_shas(path):
+    '''Yields the git commit hashes in the given directory one at a time,
+    as they are read from git log, so memory use does not grow with the
+    size of the history. Each hash is read as a fixed-size record of 40
+    hex digits and a newline.'''
+    pop = subprocess.Popen(['git', '-C', path, 'log', '--pretty=tformat:%H'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            record = pop.stdout.read(SHA_RECORD_SIZE)
+            if len(record) < SHA_RECORD_SIZE:
+                break
+            yield decode_bytes_if_necessary(record[:SHA_LENGTH])
+    finally:
+        pop.stdout.close()
+        error = pop.stderr.read()
+        pop.stderr.close()
+        pop.wait()
     if error:
-        error = decode_bytes_if_necessary(error)
-        print(error)
-        return []
-    output = decode_bytes_if_necessary(output)
-    sha_list = []
-    for line in output.split('\n'):
-        sha_list.append(line.strip('"'))
-    return sha_list
+        print(decode_bytes_if_necessary(error))
+
+def iter_hash_chunks(path, objects=None):
+    '''Yields (shas, nibbles) chunks for analyze. The hashes come from
+    git log if objects is None. Otherwise they are the IDs of all objects
+    (objects == 'all') or all commits (objects == 'commits') in the
+    repository's object database, read directly from pack indexes and loose
+    object directories.'''
+    if objects is None:
+        return iter_sha_chunks(iter_shas(path))
+    return iter_object_chunks(path, objects == 'commits')
+
+def iter_object_chunks(path, commits_only=False):
+    '''Yields (shas, nibbles) chunks for the objects in the given repository's
+    object database. The nibbles are computed straight from the raw IDs, and
+    the hex strings are only made for the hashes that get looked up. Unlike
+    git log, this includes commits that are not reachable from HEAD, and an
+    object stored in more than one pack will be counted more than once.'''
+    for object_ids in iter_object_ids(path, commits_only):
+        yield (HexObjectIds(object_ids), object_ids_to_nibbles(object_ids))
+
+def iter_object_ids(path, commits_only=False):
+    '''Yields the IDs of the objects in the given repository's object database
+    in chunks, as N x 20 arrays of raw bytes, without running git.'''
+    objects_dir = find_objects_dir(path)
+    if objects_dir is None:
+        print('fatal: not a git repository: {0}\n'.format(path))
+        return
+    pack_dir = os.path.join(objects_dir, 'pack')
+    if os.path.isdir(pack_dir):
+        for name in sorted(os.listdir(pack_dir)):
+            if not name.endswith('.idx'):
+                continue
+            pack = PackIndex(os.path.join(pack_dir, name))
+            try:
+                for object_ids in pack.iter_object_ids(commits_only):
+                    yield object_ids
+            finally:
+                pack.close()
+    loose_object_ids = []
+    for subdir in sorted(os.listdir(objects_dir)):
+        subdir_path = os.path.join(objects_dir, subdir)
+        if len(subdir) != 2 or not os.path.isdir(subdir_path):
+            continue
+        for name in sorted(os.listdir(subdir_path)):
+            if len(name) != SHA_LENGTH - 2:
+                continue
+            if commits_only and loose_object_type(os.path.join(subdir_path, name)) != b'commit':
+                continue
+            loose_object_ids.append(binascii.unhexlify(subdir + name))
+            if len(loose_object_ids) == ANALYSIS_CHUNK_SIZE:
+                yield np.frombuffer(b''.join(loose_object_ids), dtype=np.uint8).reshape(-1, OBJECT_ID_SIZE)
+                loose_object_ids = []
+    if loose_object_ids:
+        yield np.frombuffer(b''.join(loose_object_ids), dtype=np.uint8).reshape(-1, OBJECT_ID_SIZE)
+
+def find_objects_dir(path):
+    '''Returns the objects directory of the git repository at the given path,
+    which may be a work tree (including a linked work tree) or a bare
+    repository, or None if there isn't one.'''
+    git_dir = os.path.join(path, '.git')
+    if os.path.isfile(git_dir):
+        with open(git_dir) as git_file:
+            line = git_file.read().strip()
+        if line.startswith('gitdir:'):
+            git_dir = os.path.join(path, line[len('gitdir:'):].strip())
+    elif not os.path.isdir(git_dir):
+        git_dir = path
+    commondir_path = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir_path):
+        with open(commondir_path) as commondir_file:
+            git_dir = os.path.join(git_dir, commondir_file.read().strip())
+    objects_dir = os.path.join(git_dir, 'objects')
+    return objects_dir if os.path.isdir(objects_dir) else None
+
+def loose_object_type(object_path):
+    '''Returns the type of the loose object at the given path (e.g. b'commit'),
+    decompressing only enough of the file to read its header.'''
+    with open(object_path, 'rb') as object_file:
+        header = zlib.decompressobj().decompress(object_file.read(64))
+    return header.split(b' ', 1)[0]
+
+class PackIndex(object):
+    '''Memory-maps a version 2 pack index (.idx) file and, if types are needed,
+    its pack file, to list object IDs without parsing the objects themselves.'''
+
+    MAGIC = b'\xfftOc'
+    FANOUT_START = 8
+    NAMES_START = FANOUT_START + 256 * 4
+
+    def __init__(self, idx_path):
+        self.__idx_file = open(idx_path, 'rb')
+        self.__idx = mmap.mmap(self.__idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__pack_file = None
+        self.__pack = None
+        (magic, version) = struct.unpack_from('>4sI', self.__idx, 0)
+        if magic != self.MAGIC or version != 2:
+            self.close()
+            raise ValueError('{0} is not a version 2 pack index'.format(idx_path))
+        self.__count = struct.unpack_from('>I', self.__idx, self.NAMES_START - 4)[0]
+        self.__offsets_start = self.NAMES_START + self.__count * (OBJECT_ID_SIZE + 4)
+        self.__large_offsets_start = self.__offsets_start + self.__count * 4
+        self.__pack_path = idx_path[:-len('.idx')] + '.pack'
+
+    def __len__(self):
+        return self.__count
+
+    def close(self):
+        for resource in (self.__pack, self.__pack_file, self.__idx, self.__idx_file):
+            if resource is not None:
+                resource.close()
+
+    def object_id(self, position):
+        start = self.NAMES_START + position * OBJECT_ID_SIZE
+        return self.__idx[start:start + OBJECT_ID_SIZE]
+
+    def iter_object_ids(self, commits_only=False):
+        '''Yields the object IDs in this pack in sorted order, optionally
+        skipping everything but commits, as chunks of the name table copied
+        into N x 20 arrays. No view of the mapped file is held between chunks,
+        so the pack can be closed at any time.'''
+        for start in range(0, self.__count, ANALYSIS_CHUNK_SIZE):
+            end = min(start + ANALYSIS_CHUNK_SIZE, self.__count)
+            names = np.frombuffer(self.__idx, dtype=np.uint8, count=(end - start) * OBJECT_ID_SIZE,
+                                  offset=self.NAMES_START + start * OBJECT_ID_SIZE).reshape(-1, OBJECT_ID_SIZE)
+            if commits_only:
+                is_commit = np.fromiter((self.object_type(self.pack_offset(position)) == OBJ_COMMIT for position in range(start, end)),
+                                        dtype=bool, count=end - start)
+                object_ids = names[is_commit]
+            else:
+                object_ids = names.copy()
+            del names
+            if len(object_ids) > 0:
+                yield object_ids
+
+    def find(self, object_id):
+        '''Returns the position of the given object ID in this index, or None.'''
+        first_byte = bytearray(object_id[:1])[0]
+        low = struct.unpack_from('>I', self.__idx, self.FANOUT_START + 4 * (first_byte - 1))[0] if first_byte else 0
+        high = struct.unpack_from('>I', self.__idx, self.FANOUT_START + 4 * first_byte)[0]
+        while low < high:
+            middle = (low + high) // 2
+            if self.object_id(middle) < object_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.__count and self.object_id(low) == object_id:
+            return low
+        return None
+
+    def pack_offset(self, position):
+        '''Returns the offset in the pack file of the object at the given position.'''
+        offset = struct.unpack_from('>I', self.__idx, self.__offsets_start + 4 * position)[0]
+        if offset & 0x80000000:
+            large_position = offset & 0x7fffffff
+            offset = struct.unpack_from('>Q', self.__idx, self.__large_offsets_start + 8 * large_position)[0]
+        return offset
+
+    def object_type(self, offset):
+        '''Returns the type of the object at the given offset in the pack file,
+        following delta chains back to their base object.'''
+        if self.__pack is None:
+            self.__pack_file = open(self.__pack_path, 'rb')
+            self.__pack = mmap.mmap(self.__pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        while True:
+            byte = bytearray(self.__pack[offset:offset + 1])[0]
+            object_type = (byte >> 4) & 7
+            position = offset + 1
+            while byte & 0x80:
+                byte = bytearray(self.__pack[position:position + 1])[0]
+                position += 1
+            if object_type == OBJ_OFS_DELTA:
+                byte = bytearray(self.__pack[position:position + 1])[0]
+                distance = byte & 0x7f
+                while byte & 0x80:
+                    position += 1
+                    byte = bytearray(self.__pack[position:position + 1])[0]
+                    distance = ((distance + 1) << 7) | (byte & 0x7f)
+                offset -= distance
+            elif object_type == OBJ_REF_DELTA:
+                base_position = self.find(self.__pack[position:position + OBJECT_ID_SIZE])
+                if base_position is None:
+                    return None
+                offset = self.pack_offset(base_position)
+            else:
+                return object_type
     
 def decode_bytes_if_necessary(string_or_bytes):
     '''If the given parameter is of type bytes, this method will decode it
@@ -136,11 +440,13 @@ def decode_bytes_if_necessary(string_or_bytes):
     
 def create_parser():
     '''Creates and returns the argument parser for this script.'''
-    parser = argparse.ArgumentParser(description='Prints interesting facts about the SHA-1 commit hashes in a git repository.\nWill print some default facts if no options are specified.', usage='%(prog)s [-dhlr] [-p PATH] [-w WORD]')
+    parser = argparse.ArgumentParser(description='Prints interesting facts about the SHA-1 commit hashes in a git repository.\nWill print some default facts if no options are specified.', usage='%(prog)s [-dhlnr] [-p PATH] [-w WORD] [-o {commits,all}]')
     parser.add_argument('-p', '--path', dest='path', default='.', type=str, help='Path to the git repository to use. Defaults to the current directory.')
     parser.add_argument('-w', '--word', dest='word', default=None, type=str, help='Word to search for in the commit hashes.')
     parser.add_argument('-r', dest='find_repeating', action='store_const', default=False, const=True, help='Find the longest string of repeating characters.')
     parser.add_argument('-l', dest='letters', action='store_const', default=False, const=True, help='Find the longest string of only letters.')
+    parser.add_argument('-n', dest='numbers', action='store_const', default=False, const=True, help='Find the longest string of only numbers.')
+    parser.add_argument('-o', '--objects', dest='objects', default=None, choices=['commits', 'all'], help='Read the hashes of all commits, or all objects, straight from the object database instead of running git log. Includes unreachable objects.')
     parser.add_argument('-d', '--digits', dest='digits', action='store_const', default=False, const=True, help='Analyze digit frequency.')
     return parser
     
@@ -148,27 +454,28 @@ def main():
     parser = create_parser()
     args = parser.parse_args()
     path = args.path
-    sha_list = get_sha_list(path)
-    if len(sha_list) > 0:
-        print(' ')
-        default = True
-        word = args.word
-        if word and len(word) > 0 and not word.isspace():
-            find_word(sha_list, word)
-            default = False
-        if args.find_repeating:
-            find_longest_repeating_char_in_list(sha_list)
-            default = False
-        if args.letters:
-            find_longest_letter_string_in_list(sha_list)
-            default = False
-        if args.digits:
-            analyze_digit_frequency(sha_list)
-            default = False
-        if default:
-            find_word(sha_list, 'beef')
-            print(' ')
-            find_longest_repeating_char_in_list(sha_list)
+    chunks = iter_hash_chunks(path, args.objects)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return
+    chunks = chain([first_chunk], chunks)
+    print(' ')
+    accumulators = []
+    word = args.word
+    if word and len(word) > 0 and not word.isspace():
+        accumulators.append(WordSearch(word))
+    if args.find_repeating:
+        accumulators.append(longest_repeating_char_accumulator())
+    if args.letters:
+        accumulators.append(longest_letter_string_accumulator())
+    if args.numbers:
+        accumulators.append(longest_digit_string_accumulator())
+    if args.digits:
+        accumulators.append(DigitFrequency())
+    if accumulators:
+        analyze(chunks, accumulators)
+    else:
+        analyze(chunks, [WordSearch('beef'), longest_repeating_char_accumulator()], separator=' ')
 
 if __name__ == '__main__':
     main()
@@ -1,25 +1,390 @@
 #!/usr/bin/env python
 import argparse
+import bisect
+import csv
+import hashlib
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import socketserver
+import stat
+import struct
+import sys
+from array import array
+from collections import defaultdict
+from itertools import islice, takewhile
 
 MINIMUM_WORD_LENGTH = 4
+PUZZLE_LETTER_COUNT = 7
+PANGRAM_BONUS = 7
+WORDS_FILE = 'spelling_bee_words.txt'
+INDEX_FILE = 'spelling_bee_words.idx'
+OTHER_CHARACTER_BIT = 1 << 26
+MAXIMUM_LETTER_COUNT = 127
+COUNT_GUARD_BITS = int.from_bytes(b'\x80' * 26, 'little')
 
-def solve(available_letters, required_letter):
+class WordIndex():
+    '''Compiled version of the words file, grouped by letter set mask and
+    memory-mapped from a binary file next to the words file. The binary file
+    is rebuilt when the words file changes.
+
+    File layout: a header, the sorted masks (uint32), the offset of each
+    mask's words in the word blob (uint32, one extra at the end), the
+    number of the first word of each mask (uint32, one extra at the end),
+    the letter counts of each word (26 bytes per word) and the word blob.
+    Each mask's words are separated by newlines, longest first and then
+    alphabetically.'''
+
+    HEADER_FORMAT = '<8sqq20sIII'
+    MAGIC = b'SBIDX2' + (b'L\0' if sys.byteorder == 'little' else b'B\0')
+
+    def __init__(self, words_path = WORDS_FILE, index_path = INDEX_FILE):
+        self.words_path = words_path
+        self.index_path = index_path
+        self.__header_size = struct.calcsize(self.HEADER_FORMAT)
+        if not self._is_current():
+            self._build()
+        with open(index_path, 'rb') as index_file:
+            self.__map = mmap.mmap(index_file.fileno(), 0, access = mmap.ACCESS_READ)
+        (_, _, _, _, mask_count, word_count, _) = struct.unpack_from(self.HEADER_FORMAT, self.__map)
+        view = memoryview(self.__map)
+        start = self.__header_size
+        self.masks = view[start:start + 4 * mask_count].cast('I')
+        start += 4 * mask_count
+        self.__offsets = view[start:start + 4 * (mask_count + 1)].cast('I')
+        start += 4 * (mask_count + 1)
+        self.__word_starts = view[start:start + 4 * (mask_count + 1)].cast('I')
+        self.__counts_start = start + 4 * (mask_count + 1)
+        self.__blob_start = self.__counts_start + 26 * word_count
+
+    def get(self, mask, default = ()):
+        '''Returns the words that use exactly the letters in the given mask.'''
+        position = self._position(mask)
+        if position is None:
+            return default
+        start = self.__blob_start + self.__offsets[position]
+        end = self.__blob_start + self.__offsets[position + 1]
+        return self.__map[start:end].decode('utf-8').split('\n')
+
+    def get_with_counts(self, mask):
+        '''Returns (word, letter counts) pairs for the words that use exactly the
+        letters in the given mask. The letter counts are packed as by count_vector.'''
+        position = self._position(mask)
+        if position is None:
+            return []
+        start = self.__counts_start + 26 * self.__word_starts[position]
+        end = self.__counts_start + 26 * self.__word_starts[position + 1]
+        counts = [int.from_bytes(self.__map[i:i + 26], 'little') for i in range(start, end, 26)]
+        return list(zip(self.get(mask), counts))
+
+    def _position(self, mask):
+        position = bisect.bisect_left(self.masks, mask)
+        if position == len(self.masks) or self.masks[position] != mask:
+            return None
+        return position
+
+    def _is_current(self):
+        '''Checks the index file against the words file. If only the modification
+        time of the words file changed, the header is updated and no rebuild is needed.'''
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as index_file:
+            header = index_file.read(self.__header_size)
+        if len(header) != self.__header_size:
+            return False
+        (magic, mtime, size, digest, mask_count, word_count, blob_size) = struct.unpack(self.HEADER_FORMAT, header)
+        words_stat = os.stat(self.words_path)
+        if magic != self.MAGIC or size != words_stat.st_size:
+            return False
+        if mtime == words_stat.st_mtime_ns:
+            return True
+        with open(self.words_path, 'rb') as words_file:
+            if hashlib.sha1(words_file.read()).digest() != digest:
+                return False
+        with open(self.index_path, 'r+b') as index_file:
+            index_file.write(struct.pack(self.HEADER_FORMAT, magic, words_stat.st_mtime_ns, size, digest, mask_count, word_count, blob_size))
+        return True
+
+    def _build(self):
+        '''Compiles the words file into the index file.'''
+        words_stat = os.stat(self.words_path)
+        with open(self.words_path, 'rb') as words_file:
+            contents = words_file.read()
+        groups = build_index(contents.decode('utf-8').split())
+        masks = array('I', sorted(groups))
+        offsets = array('I', [0])
+        word_starts = array('I', [0])
+        counts = bytearray()
+        blob = bytearray()
+        for mask in masks:
+            blob += '\n'.join(groups[mask]).encode('utf-8')
+            offsets.append(len(blob))
+            for word in groups[mask]:
+                counts += letter_counts(word)
+            word_starts.append(word_starts[-1] + len(groups[mask]))
+        header = struct.pack(self.HEADER_FORMAT, self.MAGIC, words_stat.st_mtime_ns, words_stat.st_size,
+                             hashlib.sha1(contents).digest(), len(masks), word_starts[-1], len(blob))
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'wb') as index_file:
+            index_file.write(header)
+            index_file.write(masks.tobytes())
+            index_file.write(offsets.tobytes())
+            index_file.write(word_starts.tobytes())
+            index_file.write(counts)
+            index_file.write(blob)
+        os.replace(temp_path, self.index_path)
+
+def solve(available_letters, required_letter, limit=None, min_length=MINIMUM_WORD_LENGTH):
     '''Prints a list of solutions to the New York Times Spelling Bee game
-    with the given available letters and required letter.'''
-    with open('spelling_bee_words.txt') as words_file:
-        words = words_file.read().split()
-    solutions = []
-    for word in words:
-        if check_word(word, available_letters, required_letter):
-            solutions.append(word)
-    # Sort the solutions by length first, then alphabetically
-    solutions.sort()
-    solutions.sort(key = len, reverse = True)
-    
+    with the given available letters and required letter. Solutions are
+    printed as they are found, longest first, up to the given limit.'''
+    solutions = iter_solutions(WordIndex(), available_letters, required_letter, min_length)
     print('\nSpelling Bee solutions for letters \'{0}\' and required letter \'{1}\':\n'.format(available_letters, required_letter))
-    for solution in solutions:
+    for solution in islice(solutions, limit):
         print(solution)
-    
+
+def solve_batch(index, lines, as_json=False, limit=None, min_length=MINIMUM_WORD_LENGTH):
+    '''Solves one puzzle per line, where each line holds the available letters
+    and the required letter separated by whitespace. Yields the formatted
+    solutions for each puzzle as soon as it is solved.'''
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 0:
+            continue
+        if len(parts) != 2:
+            error = 'Expected available letters and a required letter: {0}'.format(line.strip())
+            yield json.dumps({'error': error}) + '\n' if as_json else error + '\n'
+            continue
+        (available_letters, required_letter) = parts
+        try:
+            solutions = list(islice(iter_solutions(index, available_letters, required_letter, min_length), limit))
+        except ValueError as error:
+            yield json.dumps({'error': str(error)}) + '\n' if as_json else str(error) + '\n'
+            continue
+        if as_json:
+            yield json.dumps({'letters': available_letters, 'required': required_letter, 'solutions': solutions}) + '\n'
+        else:
+            yield format_solutions(available_letters, required_letter, solutions)
+
+def serve(socket_path, as_json=False, limit=None, min_length=MINIMUM_WORD_LENGTH):
+    '''Answers puzzles sent to a Unix socket at the given path, one per line,
+    in the same format as solve_batch. The index is loaded once, so queries
+    don't pay for interpreter or index startup.'''
+    index = WordIndex()
+    class PuzzleHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode('utf-8') for line in self.rfile)
+            for output in solve_batch(index, lines, as_json, limit, min_length):
+                self.wfile.write(output.encode('utf-8'))
+                self.wfile.flush()
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            raise FileExistsError('{0} exists and is not a socket'.format(socket_path))
+        # A stale socket left behind by a previous server.
+        os.remove(socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, PuzzleHandler)
+    socket_stat = os.lstat(socket_path)
+    print('Listening on {0}'.format(socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Only remove the socket this server created, in case it was replaced.
+        if os.path.lexists(socket_path) and os.path.samestat(os.lstat(socket_path), socket_stat):
+            os.remove(socket_path)
+
+def format_solutions(available_letters, required_letter, solutions):
+    '''Returns the solutions as text, one per line, below a title line.'''
+    lines = ['', 'Spelling Bee solutions for letters \'{0}\' and required letter \'{1}\':'.format(available_letters, required_letter), '']
+    lines.extend(solutions)
+    return '\n'.join(lines) + '\n'
+
+def iter_solutions(index, available_letters, required_letter, min_length=MINIMUM_WORD_LENGTH):
+    '''Lazily yields the solutions for the given available letters and
+    required letter, sorted by length first, then alphabetically. Only the
+    letter sets that contain the required letter and are made of the
+    available letters are looked up, so the rest of the dictionary is never
+    scanned. The words for each letter set are already sorted in the index,
+    so they only need to be merged.
+
+    As with check_word, there are no solutions if the required letter is not
+    one of the available letters. Letters are not case sensitive. Raises
+    ValueError if the required letter is not a single letter from a to z.'''
+    available_letters = available_letters.lower()
+    required_letter = required_letter.lower()
+    if len(required_letter) != 1 or not 'a' <= required_letter <= 'z':
+        raise ValueError('The required letter must be a single letter from a to z: {0}'.format(required_letter))
+    required_bit = letter_mask(required_letter)
+    available_mask = letter_mask(character for character in available_letters if 'a' <= character <= 'z')
+    if required_bit & ~available_mask:
+        return iter(())
+    optional_mask = available_mask & ~required_bit
+    groups = []
+    # Walk through every subset of the optional letters, largest first.
+    subset = optional_mask
+    while True:
+        words = index.get(subset | required_bit, ())
+        if words:
+            groups.append(takewhile(lambda word: len(word) >= min_length, words))
+        if subset == 0:
+            break
+        subset = (subset - 1) & optional_mask
+    return heapq.merge(*groups, key=solution_order)
+
+def words_from_letters(index, letters, min_length=1):
+    '''Lazily yields the words that can be made from the given letters, using
+    each letter no more times than it appears (as with anagrams or a Scrabble
+    rack). Words are sorted by length first, then alphabetically. Letter sets
+    are pruned by mask first, and letter counts are only compared for the
+    words that are left.'''
+    letters = ''.join(character for character in letters.lower() if 'a' <= character <= 'z')
+    rack_mask = letter_mask(letters)
+    # Packed letter counts with the high bit of each byte set, so subtracting a
+    # word's counts only clears a high bit if the word uses too many of a letter.
+    rack_counts = count_vector(letters) | COUNT_GUARD_BITS
+    if 2 ** len(set(letters)) < len(index.masks):
+        masks = []
+        subset = rack_mask
+        while subset:
+            masks.append(subset)
+            subset = (subset - 1) & rack_mask
+    else:
+        masks = [mask for mask in index.masks if mask & ~rack_mask == 0]
+    groups = []
+    for mask in masks:
+        words = [word for (word, counts) in index.get_with_counts(mask)
+                 if len(word) >= min_length and (rack_counts - counts) & COUNT_GUARD_BITS == COUNT_GUARD_BITS]
+        if words:
+            groups.append(words)
+    return heapq.merge(*groups, key=solution_order)
+
+def letter_counts(word):
+    '''Returns 26 bytes with the number of times each letter from a to z
+    appears in the given word, up to MAXIMUM_LETTER_COUNT. Higher counts
+    would overflow into the guard bits used by words_from_letters, and no
+    word needs that many copies of a letter anyway.'''
+    counts = bytearray(26)
+    for character in word:
+        if 'a' <= character <= 'z':
+            position = ord(character) - ord('a')
+            if counts[position] < MAXIMUM_LETTER_COUNT:
+                counts[position] += 1
+    return bytes(counts)
+
+def count_vector(word):
+    '''Returns the letter counts of the given word packed into an integer,
+    one byte per letter with a in the lowest byte.'''
+    return int.from_bytes(letter_counts(word), 'little')
+
+def solution_order(word):
+    '''Sort key that puts longer words first, then sorts alphabetically.'''
+    return (-len(word), word)
+
+def build_index(words):
+    '''Returns a dict that maps each letter set mask to the words that use
+    exactly that set of letters, sorted with solution_order.'''
+    index = defaultdict(list)
+    for word in words:
+        index[letter_mask(word)].append(word)
+    for group in index.values():
+        group.sort(key=solution_order)
+    return index
+
+def letter_mask(letters):
+    '''Returns a mask with one bit set for each distinct letter from a to z
+    in the given string. Any other character (like an apostrophe) sets bit 26,
+    so words containing one never match a set of available letters.'''
+    mask = 0
+    for character in set(letters):
+        if 'a' <= character <= 'z':
+            mask |= 1 << (ord(character) - ord('a'))
+        else:
+            mask |= OTHER_CHARACTER_BIT
+    return mask
+
+def generate_puzzles(path, processes=1):
+    '''Writes every valid puzzle in the dictionary to a CSV file, or to a
+    JSONL file if the path ends in .jsonl. A valid puzzle is a set of seven
+    letters used by at least one pangram, together with one of those letters
+    as the required letter. Each row holds the answer count, pangram count
+    and total score.'''
+    index = WordIndex()
+    pangram_masks = [mask for mask in index.masks
+                     if not mask & OTHER_CHARACTER_BIT and bin(mask).count('1') == PUZZLE_LETTER_COUNT]
+    chunk_size = max(1, len(pangram_masks) // (processes * 8))
+    chunks = [pangram_masks[i:i + chunk_size] for i in range(0, len(pangram_masks), chunk_size)]
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_init_puzzle_worker)
+        results = pool.imap(_puzzle_rows, chunks)
+    else:
+        _init_puzzle_worker(index)
+        pool = None
+        results = map(_puzzle_rows, chunks)
+    fields = ['letters', 'required', 'answers', 'pangrams', 'score']
+    puzzle_count = 0
+    with open(path, 'w', newline='') as puzzles_file:
+        if path.endswith('.jsonl'):
+            write_row = lambda row: puzzles_file.write(json.dumps(dict(zip(fields, row))) + '\n')
+        else:
+            writer = csv.writer(puzzles_file)
+            writer.writerow(fields)
+            write_row = writer.writerow
+        for rows in results:
+            for row in rows:
+                write_row(row)
+            puzzle_count += len(rows)
+    if pool:
+        pool.close()
+    print('Wrote {0} puzzles from {1} pangram letter sets to {2}'.format(puzzle_count, len(pangram_masks), path))
+
+# Answer count and score of the words for each letter set mask, in each process
+# that generates puzzles.
+_mask_stats = None
+
+def _init_puzzle_worker(index=None):
+    global _mask_stats
+    index = index or WordIndex()
+    _mask_stats = {}
+    for mask in index.masks:
+        if mask & OTHER_CHARACTER_BIT:
+            continue
+        words = [word for word in index.get(mask) if len(word) >= MINIMUM_WORD_LENGTH]
+        if words:
+            is_pangram = bin(mask).count('1') == PUZZLE_LETTER_COUNT
+            _mask_stats[mask] = (len(words), sum(word_score(word, is_pangram) for word in words))
+
+def _puzzle_rows(pangram_masks):
+    '''Returns the puzzle rows for the given letter sets, in order.'''
+    rows = []
+    for pangram_mask in pangram_masks:
+        letters = [chr(ord('a') + bit) for bit in range(26) if pangram_mask & (1 << bit)]
+        # Totals for each required letter, over every subset of the letters.
+        answers = [0] * PUZZLE_LETTER_COUNT
+        scores = [0] * PUZZLE_LETTER_COUNT
+        subset = pangram_mask
+        while subset:
+            stats = _mask_stats.get(subset)
+            if stats:
+                for (position, letter) in enumerate(letters):
+                    if subset & (1 << (ord(letter) - ord('a'))):
+                        answers[position] += stats[0]
+                        scores[position] += stats[1]
+            subset = (subset - 1) & pangram_mask
+        pangram_count = _mask_stats[pangram_mask][0]
+        for (position, letter) in enumerate(letters):
+            rows.append((''.join(letters), letter, answers[position], pangram_count, scores[position]))
+    return rows
+
+def word_score(word, is_pangram):
+    '''Returns the score of a solution: one point for a four-letter word, one
+    point per letter for longer words, and a bonus for pangrams.'''
+    score = 1 if len(word) == MINIMUM_WORD_LENGTH else len(word)
+    return score + PANGRAM_BONUS if is_pangram else score
+
 def check_word(word, available_letters, required_letter):
     '''Checks a single word to see if it is a valid solution to the Spelling Bee game
     with the given available letters and required letter.'''
@@ -32,19 +397,64 @@ def check_word(word, available_letters, required_letter):
             return False
     return True
 
+def non_negative_int(value):
+    '''Argument type for options that take a count of zero or more.'''
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid int value: \'{0}\''.format(value))
+    if number < 0:
+        raise argparse.ArgumentTypeError('must be zero or more: {0}'.format(value))
+    return number
+
 def create_parser():
     '''Creates and returns the argument parser for this script.'''
     parser = argparse.ArgumentParser(description='Provides solutions to the New York Times Spelling Bee game.')
-    parser.add_argument('available_letters', type=str, help='The seven available letters used to form words.')
-    parser.add_argument('required_letter', type=str, help='The required letter that each word must contain.')
+    parser.add_argument('available_letters', type=str, nargs='?', help='The seven available letters used to form words.')
+    parser.add_argument('required_letter', type=str, nargs='?', help='The required letter that each word must contain.')
+    parser.add_argument('-l', '--limit', dest='limit', default=None, type=non_negative_int, help='Only show the first LIMIT solutions for each puzzle.')
+    parser.add_argument('-m', '--min-length', dest='min_length', default=MINIMUM_WORD_LENGTH, type=int, help='Only show solutions with at least this many letters.')
+    parser.add_argument('-w', '--words-from', dest='rack', default=None, type=str, metavar='LETTERS', help='List every word that can be made from the given letters, using each letter as many times as it appears.')
+    parser.add_argument('-b', '--batch', dest='batch', default=None, type=str, metavar='PATH', help='Solve the puzzles in the given file (- for stdin), one "letters required" pair per line.')
+    parser.add_argument('-s', '--serve', dest='socket_path', default=None, type=str, metavar='SOCKET', help='Answer puzzles sent to a Unix socket at the given path, one "letters required" pair per line (e.g. with nc -U).')
+    parser.add_argument('-g', '--generate', dest='generate', default=None, type=str, metavar='PATH', help='Write every valid puzzle with its answer count, pangram count and score to the given CSV file (or JSONL, if the path ends in .jsonl).')
+    parser.add_argument('-p', '--processes', dest='processes', default=1, type=int, help='Number of processes to use for --generate. Use 0 for one per CPU.')
+    parser.add_argument('-j', '--json', dest='json', action='store_const', default=False, const=True, help='Print the solutions to each puzzle as a line of JSON.')
     return parser
 
 def main():
     parser = create_parser()
     args = parser.parse_args()
+    if args.generate:
+        processes = args.processes if args.processes > 0 else os.cpu_count()
+        generate_puzzles(args.generate, processes)
+        return
+    if args.rack:
+        print('\nWords that can be made from the letters \'{0}\':\n'.format(args.rack))
+        for word in islice(words_from_letters(WordIndex(), args.rack, args.min_length), args.limit):
+            print(word)
+        return
+    if args.socket_path:
+        try:
+            serve(args.socket_path, args.json, args.limit, args.min_length)
+        except FileExistsError as error:
+            parser.error(str(error))
+        return
+    if args.batch:
+        batch_file = sys.stdin if args.batch == '-' else open(args.batch)
+        with batch_file:
+            for output in solve_batch(WordIndex(), batch_file, args.json, args.limit, args.min_length):
+                sys.stdout.write(output)
+                sys.stdout.flush()
+        return
+    if not args.available_letters or not args.required_letter:
+        parser.error('the available letters and the required letter are required')
     available_letters = args.available_letters
     required_letter = args.required_letter
-    solve(available_letters, required_letter)
+    try:
+        solve(available_letters, required_letter, args.limit, args.min_length)
+    except ValueError as error:
+        parser.error(str(error))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,17 +1,309 @@
 #!/usr/bin/env python3
-from collections import defaultdict
+import argparse
+import cProfile
+import hashlib
+import json
+import multiprocessing
+import os
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
 
-class Wordle():
+import numpy as np
+
+WORDS_FILE = 'wordle_words.txt'
+USED_WORDS_FILE = 'wordle_used_words.txt'
+# Optional list of extra words that are allowed as guesses but are never solutions.
+ALLOWED_GUESSES_FILE = 'wordle_allowed_guesses.txt'
+WORD_LIST_CACHE_FILE = 'wordle_word_list.json'
+# The used words file is compacted once it holds this many duplicate or empty entries.
+USED_WORDS_COMPACT_THRESHOLD = 20
+PATTERN_TABLE_FILE = 'wordle_patterns.bin'
+SUGGESTION_CACHE_FILE = 'wordle_suggestions.json'
+SWEEP_RESULTS_FILE = 'wordle_sweep.jsonl'
+DECISION_TREE_FILE = 'wordle_tree.json'
+
+# 'frequency' ranks the remaining words by summed letter frequency.
+# 'entropy' picks the guess whose patterns carry the most information.
+# 'expected' picks the guess that minimizes the expected number of remaining words.
+STRATEGIES = ('frequency', 'entropy', 'expected')
+
+# When scoring every guess against every candidate would take more than this
+# many table reads, the guesses are first scored against an evenly spaced
+# sample of the candidates, and only the best of them are scored exactly.
+SCORE_PRUNE_ELEMENTS = 1 << 23
+SCORE_SAMPLE_SIZE = 400
+SCORE_SHORTLIST_SIZE = 100
+
+# Every possible pattern, indexed by its base-3 code. B = 0, Y = 1, G = 2,
+# and the first letter of the word is the least significant digit.
+PATTERNS = [''.join('BYG'[(code // 3 ** index) % 3] for index in range(5)) for code in range(3 ** 5)]
+PATTERN_CODES = {pattern: code for (code, pattern) in enumerate(PATTERNS)}
+SOLVED_CODE = PATTERN_CODES['GGGGG']
+
+def pattern_code(solution, guess):
+    '''Returns the base-3 code of the pattern of colors that would appear
+    in a Wordle game for the given guess and the given solution.'''
+    code = 0
+    remaining = defaultdict(int)
+    for (index, character) in enumerate(solution):
+        if guess[index] == character:
+            code += 2 * 3 ** index
+        else:
+            remaining[character] += 1
+    for (index, character) in enumerate(guess):
+        if solution[index] != character and remaining[character] > 0:
+            code += 3 ** index
+            remaining[character] -= 1
+    return code
+
+class PatternTable():
+    '''Matrix of pattern codes for every (guess, solution) pair of words,
+    stored as uint8 in a memory-mapped cache file. The file is rebuilt
+    whenever the word list changes. The solutions are the first
+    solution_count guess words.'''
+
+    HEADER_MAGIC = b'WRDLPAT2'
+    HEADER_SIZE = 36
+    BUILD_CHUNK_ROWS = 512
+    SCORE_CHUNK_ELEMENTS = 1 << 21
+
+    def __init__(self, words, solution_count = None, path = PATTERN_TABLE_FILE):
+        self.words = words
+        self.solution_count = len(words) if solution_count is None else solution_count
+        self.index = {word: index for (index, word) in enumerate(words)}
+        self.digest = hashlib.sha1('{0}:{1}'.format(self.solution_count, ','.join(words)).encode('utf-8')).digest()
+        self.matrix = self._load(path)
+
+    def code(self, solution, guess):
+        '''Returns the pattern code for the given solution and guess.
+        Words that are not in the table are scored directly.'''
+        guess_index = self.index.get(guess)
+        solution_index = self.index.get(solution)
+        if guess_index is None or solution_index is None or solution_index >= self.solution_count:
+            return pattern_code(solution, guess)
+        return int(self.matrix[guess_index, solution_index])
+
+    def guess_codes(self, guess, columns):
+        '''Returns an array of the pattern codes for the given guess against
+        the solutions at the given column indexes.'''
+        guess_index = self.index.get(guess)
+        if guess_index is None:
+            return np.array([pattern_code(self.words[column], guess) for column in columns], dtype = np.uint8)
+        return np.asarray(self.matrix[guess_index, columns])
+
+    def partition_sizes(self, columns, group_ids = None, group_count = 1, rows = slice(None)):
+        '''For every guess in the given rows of the table, counts how many of
+        the solutions at the given column indexes produce each pattern code.
+        Columns can be split into groups (one per board) with group_ids.
+        Returns an array of shape (number of guesses, group_count, 243).'''
+        # Select rows and columns together so only the needed cells are copied out of the table.
+        if isinstance(rows, slice):
+            codes = self.matrix[rows, columns].astype(np.intp)
+        else:
+            codes = self.matrix[np.ix_(rows, columns)].astype(np.intp)
+        bin_count = group_count * len(PATTERNS)
+        if group_ids is not None:
+            codes += group_ids * len(PATTERNS)
+        codes += np.arange(len(codes), dtype = np.intp)[:, None] * bin_count
+        sizes = np.bincount(codes.ravel(), minlength = len(codes) * bin_count)
+        return sizes.reshape(len(codes), group_count, len(PATTERNS))
+
+    def partition_scores(self, columns, strategy, group_ids = None, group_weights = None, rows = None):
+        '''Scores the guesses at the given row indexes (every guess by default)
+        against the solutions at the given column indexes. Higher scores are
+        better. When the columns are split into groups, the score is the
+        weighted sum of the group scores.'''
+        if group_ids is None:
+            totals = np.array([len(columns)], dtype = np.float64)
+            group_weights = np.ones(1)
+        else:
+            # A group can be missing from a sample of the columns.
+            totals = np.maximum(np.bincount(group_ids, minlength = len(group_weights)), 1).astype(np.float64)
+        if rows is None:
+            rows = np.arange(len(self.words))
+        scores = np.empty(len(rows))
+        # Score the guesses in chunks to keep the intermediate arrays small.
+        chunk_size = max(1, self.SCORE_CHUNK_ELEMENTS // len(columns))
+        for start in range(0, len(rows), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            sizes = self.partition_sizes(columns, group_ids, len(totals), rows[chunk])
+            if strategy == 'expected':
+                group_scores = -(sizes.astype(np.float64) ** 2).sum(axis = 2) / totals
+            else:
+                # Entropy of the partition: log2(n) - sum(c * log2(c)) / n
+                weighted = (sizes * np.log2(np.maximum(sizes, 1))).sum(axis = 2)
+                group_scores = np.log2(totals) - weighted / totals
+            scores[chunk] = group_scores @ group_weights
+        return scores
+
+    def _header(self):
+        return self.HEADER_MAGIC + self.digest + len(self.words).to_bytes(4, 'little') + self.solution_count.to_bytes(4, 'little')
+
+    def _load(self, path):
+        '''Memory-maps the cached matrix, rebuilding the cache file first
+        if it is missing or was built from a different word list.'''
+        header = self._header()
+        shape = (len(self.words), self.solution_count)
+        if os.path.exists(path) and os.path.getsize(path) == self.HEADER_SIZE + shape[0] * shape[1]:
+            with open(path, 'rb') as table_file:
+                is_current = table_file.read(self.HEADER_SIZE) == header
+        else:
+            is_current = False
+        if not is_current:
+            letters = np.array([[ord(character) for character in word] for word in self.words], dtype = np.uint8).reshape(-1, 5)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as table_file:
+                table_file.write(header)
+                for start in range(0, len(self.words), self.BUILD_CHUNK_ROWS):
+                    guess_letters = letters[start:start + self.BUILD_CHUNK_ROWS]
+                    table_file.write(self._build_rows(guess_letters, letters[:self.solution_count]).tobytes())
+            os.replace(temp_path, path)
+        return np.memmap(path, dtype = np.uint8, mode = 'r', offset = self.HEADER_SIZE, shape = shape)
+
+    def _build_rows(self, guess_letters, solution_letters):
+        '''Computes the pattern code of every (guess, solution) pair for the
+        given arrays of letters at once. Rows are guesses and columns are solutions.'''
+        guess_letters = guess_letters[:, None, :]
+        solution_letters = solution_letters[None, :, :]
+        greens = guess_letters == solution_letters
+        codes = np.zeros(greens.shape[:2], dtype = np.uint8)
+        yellows = []
+        for index in range(5):
+            letter = guess_letters[:, :, index]
+            # Copies of this letter in the solution that are not already green...
+            available = ((solution_letters == letter[:, :, None]) & ~greens).sum(axis = 2)
+            # ...minus the ones claimed by yellows earlier in the guess.
+            for earlier in range(index):
+                available -= (guess_letters[:, :, earlier] == letter) & yellows[earlier]
+            yellow = ~greens[:, :, index] & (available > 0)
+            yellows.append(yellow)
+            codes += (2 * greens[:, :, index] + yellow).astype(np.uint8) * np.uint8(3 ** index)
+        return codes
+
+class SuggestionCache():
+    '''Least recently used cache of suggested words, keyed by a hash of the
+    word list, the strategy and the set of remaining candidates.
+    Entries can be saved to a JSON file and loaded again in a later run.'''
+
+    def __init__(self, word_list_digest, path = SUGGESTION_CACHE_FILE, max_size = 100000):
+        self.path = path
+        self.max_size = max_size
+        self.__word_list_digest = word_list_digest
+        self.__entries = OrderedDict()
+        # Entries added since the last call to new_entries(), only kept when
+        # track_new_entries is set (in pool workers, which hand them back).
+        self.track_new_entries = False
+        self.__new_entries = {}
+        if path and os.path.exists(path):
+            with open(path) as cache_file:
+                for (key, word) in json.load(cache_file):
+                    self.__entries[key] = word
+
+    def key(self, strategy, candidates):
+        '''Returns the canonical key for the given strategy and bitset of candidates.'''
+        candidate_bytes = candidates.to_bytes((candidates.bit_length() + 7) // 8, 'little')
+        return hashlib.sha1(self.__word_list_digest + strategy.encode('utf-8') + b':' + candidate_bytes).hexdigest()[:32]
+
+    def get(self, key):
+        word = self.__entries.get(key)
+        if word is not None:
+            self.__entries.move_to_end(key)
+        return word
+
+    def put(self, key, word):
+        self.__entries[key] = word
+        self.__entries.move_to_end(key)
+        if self.track_new_entries:
+            self.__new_entries[key] = word
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last = False)
+
+    def new_entries(self):
+        '''Returns and forgets the entries added since the last call.'''
+        (entries, self.__new_entries) = (self.__new_entries, {})
+        return entries
+
+    def save(self):
+        '''Writes the cache to disk, least recently used entries first.'''
+        if not self.path:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump(list(self.__entries.items()), cache_file, separators = (',', ':'))
+        os.replace(temp_path, self.path)
+
+class SolverStats():
+    '''Counters and timings collected by a Wordle solver, broken down by turn
+    where that makes sense.'''
 
     def __init__(self):
+        self.counters = defaultdict(int)
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.turn_times = defaultdict(lambda: defaultdict(float))
+
+    def count(self, name, amount = 1):
+        self.counters[name] += amount
+
+    def add_time(self, name, seconds, turn = None):
+        self.times[name] += seconds
+        self.calls[name] += 1
+        if turn != None:
+            self.turn_times[name][turn] += seconds
+
+    def summary(self):
+        '''Returns the statistics as a dict that can be written out as JSON.'''
+        return {
+            'counters': dict(self.counters),
+            'timings': {name: {
+                'seconds': self.times[name],
+                'calls': self.calls[name],
+                'seconds_by_turn': {str(turn): seconds for (turn, seconds) in sorted(self.turn_times[name].items())},
+            } for name in self.times},
+        }
+
+    def merge(self, summary):
+        '''Adds the statistics from a summary, e.g. one made in a worker process.'''
+        for (name, amount) in summary['counters'].items():
+            self.counters[name] += amount
+        for (name, timing) in summary['timings'].items():
+            self.times[name] += timing['seconds']
+            self.calls[name] += timing['calls']
+            for (turn, seconds) in timing['seconds_by_turn'].items():
+                self.turn_times[name][int(turn)] += seconds
+
+class Wordle():
+
+    def __init__(self, cache_path = SUGGESTION_CACHE_FILE, collect_stats = False):
+        '''Suggestions are memoized in a cache that is loaded from cache_path.
+        Pass None to keep the cache in memory only. If collect_stats is True,
+        counters and timings are collected and returned by stats_summary.'''
+        self.__stats = SolverStats() if collect_stats else None
         self._load_word_list()
+        self.__pattern_table = PatternTable(self.__guess_words, len(self.__all_words))
+        self._build_letter_indexes()
+        self.__suggestion_cache = SuggestionCache(self.__pattern_table.digest, cache_path)
+        self.__strategy = STRATEGIES[0]
+        self.__hard_mode = False
+        self.__tree_path = None
+        self.__decision_tree = None
+        self.__tree_strategy = None
         self._reset_variables()
 
     # Public
 
-    def start(self):
-        '''Start a Wordle game.'''
+    def start(self, strategy = STRATEGIES[0], hard_mode = False):
+        '''Start a Wordle game. In hard mode, revealed hints must be used
+        in every later guess.'''
+        self.__strategy = strategy
+        self.__hard_mode = hard_mode
         self._reset_variables()
+        if self.__decision_tree:
+            print('Suggested first word: {0}'.format(self._suggested_word().upper()))
         while self.__turn < 7:
             guess = self._take_guess()
             if guess == 'q':
@@ -33,6 +325,8 @@ class Wordle():
                 suggested_word = self._suggested_word()
                 if suggested_word:
                     print('Suggested word: {0}'.format(suggested_word.upper()))
+                if self._uses_tree():
+                    print('Expected guesses left: {0:.2f}'.format(self.__tree_node[1]))
             self.__turn += 1
         print("Uh oh, we didn't get it.")
         filtered_words = self._filtered_words()
@@ -41,9 +335,11 @@ class Wordle():
             for word in filtered_words:
                 print(word)
 
-    def autoplay(self, solution, first_guess = None, print_guesses = False):
+    def autoplay(self, solution, first_guess = None, print_guesses = False, strategy = STRATEGIES[0], hard_mode = False):
         '''Determine how many guesses it would take to solve the Wordle
         using the script's suggested word for every guess.'''
+        self.__strategy = strategy
+        self.__hard_mode = hard_mode
         self._reset_variables()
         guess = first_guess
         if guess == None:
@@ -56,20 +352,26 @@ class Wordle():
                 return self.__turn
             self._compute_guess(guess, pattern)
             guess = self._suggested_word()
+            if guess is None:
+                # No candidates are left, e.g. the solution is not in the word list.
+                break
             self.__turn += 1
         if print_guesses:
             print('X')
         return None
 
-    def test(self, first_guess = None):
+    def test(self, first_guess = None, strategy = STRATEGIES[0], processes = 1, hard_mode = False):
         '''Test how well the script would do at solving the Wordle
-        for all of the available words in the word list.'''
+        for all of the available words in the word list.
+        If processes is greater than 1, the games are split into shards
+        and played in a pool of worker processes.'''
+        start_time = time.perf_counter()
         score_dict = defaultdict(int)
-        for (index, word) in enumerate(self.__word_list):
-            score = self.autoplay(word, first_guess)
+        for (index, word, score) in self._test_scores(first_guess, strategy, processes, hard_mode):
             score_dict[score] += 1
             score_string = 'X' if score == None else score
             print('{0:<4} {1}: {2}'.format(index, word, score_string))
+        elapsed = time.perf_counter() - start_time
         total_guesses = 0
         for score in range(1, 7):
             total_guesses += (score * score_dict[score])
@@ -77,37 +379,398 @@ class Wordle():
         print('X: {0}'.format(score_dict[None]))
         average_score = total_guesses / len(self.__word_list)
         print('Average: {0}'.format(average_score))
+        print('Time: {0:.2f} s ({1:.1f} games per second)'.format(elapsed, len(self.__word_list) / elapsed))
+
+    def autoplay_boards(self, solutions, first_guess = None, print_guesses = False, strategy = STRATEGIES[0]):
+        '''Determine how many guesses it would take to solve several Wordles
+        at once (as in Quordle or Octordle), where every guess is played on
+        all of the boards that haven't been solved yet. There are five more
+        turns than boards. Returns None if some boards weren't solved in time.'''
+        self.__strategy = strategy
+        self.__hard_mode = False
+        table = self.__pattern_table
+        boards = [self.__solution_mask for _ in solutions]
+        unsolved = list(range(len(solutions)))
+        start_time = time.perf_counter()
+        guess = first_guess or self._suggested_board_word(boards)
+        if self.__stats:
+            self.__stats.add_time('suggestion', time.perf_counter() - start_time, 1)
+        for turn in range(1, len(solutions) + 6):
+            if guess == None:
+                break
+            if print_guesses:
+                print(guess)
+            self._count('pattern_lookups', len(unsolved))
+            for index in list(unsolved):
+                code = table.code(solutions[index], guess)
+                if code == SOLVED_CODE:
+                    unsolved.remove(index)
+                else:
+                    boards[index] = self._narrowed_candidates(boards[index], guess, PATTERNS[code])
+            if not unsolved:
+                return turn
+            start_time = time.perf_counter()
+            guess = self._suggested_board_word([boards[index] for index in unsolved])
+            if self.__stats:
+                self.__stats.add_time('suggestion', time.perf_counter() - start_time, turn + 1)
+        if print_guesses:
+            print('X')
+        return None
+
+    def test_boards(self, board_count = 4, game_count = 500, seed = 0, first_guess = None, strategy = STRATEGIES[0], processes = 1):
+        '''Test how well the script would do at solving games with the given
+        number of boards, for randomly chosen solutions from the word list.'''
+        random_generator = random.Random(seed)
+        games = [random_generator.sample(self.__word_list, board_count) for _ in range(game_count)]
+        start_time = time.perf_counter()
+        if processes <= 1:
+            scores = [self.autoplay_boards(game, first_guess, strategy = strategy) for game in games]
+        else:
+            shard_size = max(1, game_count // (processes * 8))
+            shards = [(games[i:i + shard_size], first_guess, strategy) for i in range(0, game_count, shard_size)]
+            scores = []
+            collect_stats = self.__stats != None
+            with multiprocessing.Pool(processes, initializer = _init_worker, initargs = (self.__suggestion_cache.path, None, collect_stats)) as pool:
+                for (shard_scores, stats) in pool.imap(_autoplay_board_shard, shards):
+                    scores.extend(shard_scores)
+                    if stats:
+                        self.__stats.merge(stats)
+        elapsed = time.perf_counter() - start_time
+        score_dict = defaultdict(int)
+        for score in scores:
+            score_dict[score] += 1
+        total_guesses = 0
+        for score in range(board_count, board_count + 6):
+            total_guesses += (score * score_dict[score])
+            print('{0}: {1}'.format(score, score_dict[score]))
+        print('X: {0}'.format(score_dict[None]))
+        solved_count = game_count - score_dict[None]
+        if solved_count > 0:
+            print('Average (solved games): {0}'.format(total_guesses / solved_count))
+        print('Time: {0:.2f} s ({1:.1f} games per second)'.format(elapsed, game_count / elapsed))
+
+    def solve_histories(self, lines, strategy = STRATEGIES[0]):
+        '''Yields a result for each JSON game history in the given lines, as
+        soon as it is solved. A history is either a list of [guess, pattern]
+        pairs or an object with the list under "history" and an optional "id".
+        Each result holds the number of remaining words and the suggested
+        next guess, or an error message.'''
+        self.__strategy = strategy
+        self.__hard_mode = False
+        self._reset_variables()
+        initial_state = self._save_state()
+        for line in lines:
+            if not line.strip():
+                continue
+            self._restore_state(initial_state)
+            result = {}
+            try:
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    if 'id' in record:
+                        result['id'] = record['id']
+                    record = record['history']
+                for (guess, pattern) in record:
+                    if not isinstance(guess, str) or not isinstance(pattern, str):
+                        raise ValueError('Invalid guess or pattern: {0} {1}'.format(guess, pattern))
+                    (guess, pattern) = (guess.lower(), pattern.upper())
+                    if len(guess) != 5 or not guess.isalpha() or pattern not in PATTERN_CODES:
+                        raise ValueError('Invalid guess or pattern: {0} {1}'.format(guess, pattern))
+                    self._compute_guess(guess, pattern)
+                    self.__turn += 1
+            except (ValueError, KeyError, TypeError) as error:
+                result['error'] = str(error)
+                yield result
+                continue
+            result['remaining'] = len(self._candidate_indexes())
+            result['suggestion'] = self._suggested_word()
+            yield result
+
+    def build_tree(self, path = DECISION_TREE_FILE, first_guess = None, strategy = STRATEGIES[0]):
+        '''Plays out every solution with the given strategy and writes the
+        resulting decision tree to a JSON file. Each node maps a path of
+        pattern codes to the guess to play and the expected number of
+        guesses needed from that node on.'''
+        self.__strategy = strategy
+        self.__hard_mode = False
+        # Build from scratch, not from a loaded tree.
+        decision_tree = self.__decision_tree
+        self.__decision_tree = None
+        self._reset_variables()
+        guess = first_guess or self._suggested_word()
+        nodes = {}
+        total_guesses = self._build_tree_node('', guess, self.__candidates, nodes)
+        self.__decision_tree = decision_tree
+        self._reset_variables()
+        tree = {
+            'digest': self.__pattern_table.digest.hex(),
+            'strategy': strategy,
+            'nodes': nodes,
+        }
+        with open(path, 'w') as tree_file:
+            json.dump(tree, tree_file, separators = (',', ':'))
+        average = total_guesses / bin(self.__solution_mask).count('1')
+        print('Wrote {0} nodes to {1}. Expected guesses: {2}'.format(len(nodes), path, average))
+
+    def load_tree(self, path = DECISION_TREE_FILE, strategy = None):
+        '''Loads a decision tree written by build_tree. Suggestions come from
+        the tree until the game leaves it, and only for games played with the
+        strategy the tree was built for. Returns False if the tree was built
+        from a different word list. Raises ValueError if a strategy is given
+        and the tree was built for a different one.'''
+        with open(path) as tree_file:
+            tree = json.load(tree_file)
+        if tree['digest'] != self.__pattern_table.digest.hex():
+            return False
+        if strategy is not None and tree['strategy'] != strategy:
+            raise ValueError('The decision tree in {0} was built for the {1} strategy, not {2}.'.format(path, tree['strategy'], strategy))
+        self.__tree_path = path
+        self.__decision_tree = tree['nodes']
+        self.__tree_strategy = tree['strategy']
+        self._reset_variables()
+        return True
+
+    def sweep(self, path = SWEEP_RESULTS_FILE, first_guesses = None, strategy = STRATEGIES[0], processes = 1):
+        '''Tests every word in the word list (or the given first guesses) as
+        the first guess and appends the results to a JSONL file, one line per
+        first guess. First guesses that already have results for this
+        strategy in the file are skipped, so an interrupted sweep can be resumed.
+        Raises ValueError if a first guess is not a five-letter word.'''
+        requested = first_guesses or self.__all_words
+        for word in requested:
+            if len(word) != 5 or not word.isalpha():
+                raise ValueError('Invalid first guess: {0}'.format(word))
+        done = set()
+        if os.path.exists(path):
+            with open(path) as results_file:
+                for line in results_file:
+                    # A line cut off by an interruption is simply redone.
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        continue
+                    if result['strategy'] == strategy:
+                        done.add(result['first_guess'])
+        first_guesses = [word for word in requested if word not in done]
+        print('{0} first guesses done, {1} to go.'.format(len(done & set(requested)), len(first_guesses)))
+        jobs = [(word, strategy) for word in first_guesses]
+        if processes <= 1:
+            global _worker_wordle
+            _worker_wordle = self
+            results = map(_sweep_first_guess, jobs)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes, initializer = _init_worker, initargs = (self.__suggestion_cache.path, None, False))
+            results = pool.imap_unordered(_sweep_first_guess, jobs)
+        try:
+            with open(path, 'a') as results_file:
+                for (index, result) in enumerate(results):
+                    results_file.write(json.dumps(result) + '\n')
+                    results_file.flush()
+                    os.fsync(results_file.fileno())
+                    print('{0:<5} {1}: {2:.4f} ({3} X)'.format(index, result['first_guess'], result['average'], result['failures']))
+        finally:
+            if pool:
+                pool.terminate()
+
+    def save_cache(self):
+        '''Saves the memoized suggestions so that later runs can reuse them.'''
+        self.__suggestion_cache.save()
+
+    def stats_summary(self):
+        '''Returns the statistics collected so far, or None if they aren't being collected.'''
+        return self.__stats.summary() if self.__stats else None
+
+    def take_stats_summary(self):
+        '''Returns the statistics collected so far and starts over, or returns
+        None if they aren't being collected.'''
+        summary = self.stats_summary()
+        if self.__stats:
+            self.__stats = SolverStats()
+        return summary
+
+    def track_new_suggestions(self):
+        '''Keeps the suggestions memoized from now on until they are taken
+        with new_cached_suggestions. Used by pool workers.'''
+        self.__suggestion_cache.track_new_entries = True
+
+    def new_cached_suggestions(self):
+        '''Returns the suggestions memoized since the last call, as a dict.'''
+        return self.__suggestion_cache.new_entries()
 
     def is_used(self, word):
         '''Returns True if the given word has been used in a previous Wordle.'''
         return word in self.__used_words
 
+    def is_solution(self, word):
+        '''Returns True if the given word is in the word list and has not been used yet.'''
+        return word in self.__word_list
+
     # Private
 
     def _load_word_list(self):
-        with open('wordle_words.txt') as words_file:
-            all_words = words_file.read().split(',')
-        with open('wordle_used_words.txt') as used_words_file:
-            self.__used_words = used_words_file.read().split(',')
-        self.__word_list = list(set(all_words) - set(self.__used_words))
+        '''Loads the word lists from the cache file if neither word file has
+        been modified since the cache was written. Otherwise reads the word
+        files and rewrites the cache.'''
+        has_allowed_guesses = os.path.exists(ALLOWED_GUESSES_FILE)
+        mtimes = [os.stat(WORDS_FILE).st_mtime_ns, os.stat(USED_WORDS_FILE).st_mtime_ns,
+                  os.stat(ALLOWED_GUESSES_FILE).st_mtime_ns if has_allowed_guesses else None]
+        if os.path.exists(WORD_LIST_CACHE_FILE):
+            with open(WORD_LIST_CACHE_FILE) as cache_file:
+                cache = json.load(cache_file)
+            if cache['mtimes'] == mtimes:
+                self.__all_words = cache['all_words']
+                self.__guess_words = cache['guess_words']
+                self.__used_words = set(cache['used_words'])
+                self.__word_list = cache['word_list']
+                return
+        with open(WORDS_FILE) as words_file:
+            # Keep the file order so that indexes into the pattern table are stable.
+            self.__all_words = list(dict.fromkeys(words_file.read().split(',')))
+        # The allowed guesses go after the solutions, so solution indexes are the same either way.
+        self.__guess_words = list(self.__all_words)
+        if has_allowed_guesses:
+            with open(ALLOWED_GUESSES_FILE) as allowed_guesses_file:
+                allowed_guesses = allowed_guesses_file.read().split(',')
+            self.__guess_words = list(dict.fromkeys(self.__all_words + [word.strip() for word in allowed_guesses if word.strip()]))
+        with open(USED_WORDS_FILE) as used_words_file:
+            used_word_log = used_words_file.read().split(',')
+        self.__used_words = set(used_word_log)
+        self.__used_words.discard('')
+        if len(used_word_log) - len(self.__used_words) >= USED_WORDS_COMPACT_THRESHOLD:
+            self._compact_used_words(used_word_log)
+            mtimes[1] = os.stat(USED_WORDS_FILE).st_mtime_ns
+        self.__word_list = [word for word in self.__all_words if word not in self.__used_words]
+        cache = {
+            'mtimes': mtimes,
+            'all_words': self.__all_words,
+            'guess_words': self.__guess_words,
+            'used_words': sorted(self.__used_words),
+            'word_list': self.__word_list,
+        }
+        temp_path = WORD_LIST_CACHE_FILE + '.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump(cache, cache_file, separators = (',', ':'))
+        os.replace(temp_path, WORD_LIST_CACHE_FILE)
 
     def _add_used_word(self, word):
-        '''Adds a new word to the wordle_used_words.txt file.'''
+        '''Appends a new word to the wordle_used_words.txt file.'''
         if word in self.__used_words:
             return
-        self.__used_words.append(word)
-        with open('wordle_used_words.txt', 'w') as used_words_file:
-            used_words_file.write(','.join(self.__used_words))
+        self.__used_words.add(word)
+        with open(USED_WORDS_FILE, 'a') as used_words_file:
+            used_words_file.write(',' + word)
+            used_words_file.flush()
+            os.fsync(used_words_file.fileno())
+
+    def _compact_used_words(self, used_word_log):
+        '''Rewrites the wordle_used_words.txt file without duplicate or empty entries.'''
+        words = [word for word in dict.fromkeys(used_word_log) if word]
+        temp_path = USED_WORDS_FILE + '.tmp'
+        with open(temp_path, 'w') as used_words_file:
+            used_words_file.write(','.join(words))
+            used_words_file.flush()
+            os.fsync(used_words_file.fileno())
+        os.replace(temp_path, USED_WORDS_FILE)
+
+    def _test_scores(self, first_guess, strategy, processes, hard_mode = False):
+        '''Yields (index, solution, score) for every word in the word list,
+        in word list order regardless of how many processes are used.'''
+        words = self.__word_list
+        if processes <= 1:
+            for (index, word) in enumerate(words):
+                yield (index, word, self.autoplay(word, first_guess, strategy = strategy, hard_mode = hard_mode))
+            return
+        # Use several shards per process so that slow shards don't leave workers idle.
+        shard_size = max(1, len(words) // (processes * 8))
+        shards = [(words[i:i + shard_size], first_guess, strategy, hard_mode) for i in range(0, len(words), shard_size)]
+        index = 0
+        cache = self.__suggestion_cache
+        collect_stats = self.__stats != None
+        with multiprocessing.Pool(processes, initializer = _init_worker, initargs = (cache.path, self.__tree_path, collect_stats)) as pool:
+            # imap returns shards in order, so the merged results are deterministic.
+            for (shard_scores, cache_entries, stats) in pool.imap(_autoplay_shard, shards):
+                for (key, suggestion) in cache_entries.items():
+                    cache.put(key, suggestion)
+                if stats:
+                    self.__stats.merge(stats)
+                for (word, score) in shard_scores:
+                    yield (index, word, score)
+                    index += 1
+
+    def _build_letter_indexes(self):
+        '''Builds bitsets over the indexes of all guess words, used to narrow
+        down the candidate words with a few AND operations per guess.'''
+        self.__all_mask = (1 << len(self.__guess_words)) - 1
+        # Words with the given letter at each position.
+        self.__position_masks = [defaultdict(int) for _ in range(5)]
+        # Words with at least N copies of the given letter, for N = 0 to 6.
+        self.__count_masks = defaultdict(lambda: [self.__all_mask, 0, 0, 0, 0, 0, 0])
+        self.__solution_mask = 0
+        for (index, word) in enumerate(self.__guess_words):
+            bit = 1 << index
+            for (position, character) in enumerate(word):
+                self.__position_masks[position][character] |= bit
+            for character in set(word):
+                count_masks = self.__count_masks[character]
+                for count in range(1, word.count(character) + 1):
+                    count_masks[count] |= bit
+            if index < len(self.__all_words) and word not in self.__used_words:
+                self.__solution_mask |= bit
+
+    def _build_tree_node(self, path, guess, candidates, nodes):
+        '''Adds the node for the given path to the decision tree, along with
+        every node below it. Returns the total number of guesses needed to
+        solve each of the candidates from this node on.'''
+        self.__candidates = candidates
+        columns = self._candidate_indexes()
+        codes = self.__pattern_table.guess_codes(guess, columns)
+        self._count('pattern_reads', len(columns))
+        total_guesses = len(columns)
+        for code in np.unique(codes):
+            if code == SOLVED_CODE:
+                continue
+            child_columns = columns[codes == code]
+            child_candidates = self._mask_from_indexes(child_columns)
+            self.__candidates = child_candidates
+            child_path = '{0},{1}'.format(path, code) if path else str(code)
+            child_guess = self._suggested_word()
+            total_guesses += self._build_tree_node(child_path, child_guess, child_candidates, nodes)
+        nodes[path] = [guess, round(total_guesses / len(columns), 4)]
+        return total_guesses
+
+    def _count(self, name, amount = 1):
+        '''Adds to one of the statistics counters, if statistics are being collected.'''
+        if self.__stats:
+            self.__stats.count(name, amount)
+
+    def _mask_from_indexes(self, indexes):
+        '''Returns the bitset with the bits at the given word indexes set.'''
+        bits = np.zeros(len(self.__guess_words), dtype = np.uint8)
+        bits[indexes] = 1
+        return int.from_bytes(np.packbits(bits, bitorder = 'little').tobytes(), 'little')
+
+    def _save_state(self):
+        '''Returns the state of the current game, for _restore_state.'''
+        return (self.__turn, self.__guess_count, self.__candidates, self.__tree_pattern_path, self.__tree_node,
+                tuple(self.__required_letters), dict(self.__required_counts))
+
+    def _restore_state(self, state):
+        (self.__turn, self.__guess_count, self.__candidates, self.__tree_pattern_path, self.__tree_node, required_letters, required_counts) = state
+        self.__required_letters = list(required_letters)
+        self.__required_counts = dict(required_counts)
 
     def _reset_variables(self):
         self.__turn = 1
-        self.__must_contain = set()
-        self.__must_contain_two = set()
-        self.__must_contain_three = set()
-        self.__must_contain_exactly_one = set()
-        self.__must_contain_exactly_two = set()
-        self.__excluded_letters = [set(), set(), set(), set(), set()]
-        self.__known_letters = [None, None, None, None, None]
+        self.__guess_count = 0
+        self.__candidates = self.__solution_mask
+        self.__candidate_cache = (None, None)
+        # The decision tree node for the current game, or None once the game leaves the tree.
+        self.__tree_pattern_path = ''
+        self.__tree_node = self.__decision_tree.get('') if self.__decision_tree else None
+        # Hints that hard mode requires later guesses to use.
+        self.__required_letters = [None, None, None, None, None]
+        self.__required_counts = {}
 
     def _take_guess(self):
         '''Ask the user to enter a five-letter Wordle guess.'''
@@ -118,11 +781,36 @@ class Wordle():
         else:
             print('Type your guess:')
         guess = input('>>> ').lower()
-        while guess != 'q' and (len(guess) != 5 or not guess.isalpha()):
-            print('Please enter a 5 letter word.')
+        while guess != 'q':
+            if len(guess) != 5 or not guess.isalpha():
+                print('Please enter a 5 letter word.')
+            elif self.__hard_mode and not self._is_hard_mode_guess(guess):
+                print('In hard mode, your guess must use all of the hints so far.')
+            else:
+                break
             guess = input('>>> ').lower()
         return guess
 
+    def _is_hard_mode_guess(self, guess):
+        '''Determines if the given guess uses every hint revealed so far.'''
+        for (index, letter) in enumerate(self.__required_letters):
+            if letter != None and guess[index] != letter:
+                return False
+        for (letter, count) in self.__required_counts.items():
+            if guess.count(letter) < count:
+                return False
+        return True
+
+    def _hard_mode_mask(self):
+        '''Returns the bitset of guess words that use every hint revealed so far.'''
+        mask = self.__all_mask
+        for (index, letter) in enumerate(self.__required_letters):
+            if letter != None:
+                mask &= self.__position_masks[index][letter]
+        for (letter, count) in self.__required_counts.items():
+            mask &= self.__count_masks[letter][count]
+        return mask
+
     def _take_pattern(self, guess):
         '''Ask the user to enter the result of a Wordle guess.'''
         print('Type the colors of the letters in this guess.')
@@ -138,77 +826,132 @@ class Wordle():
     def _pattern(self, solution, guess):
         '''Returns the pattern of colors that would appear in a Wordle game
         for the given guess and the given solution.'''
-        pattern = ['', '', '', '', '']
-        # Handle greens first
-        filtered_solution = list(solution)
-        filtered_guess = list(guess)
-        for (index, character) in enumerate(guess):
-            if guess[index] == solution[index]:
-                pattern[index] = 'G'
-                filtered_solution[index] = ''
-                filtered_guess[index] = ''
-        # Handle yellows and blanks
-        for (index, character) in enumerate(filtered_guess):
-            if character == '':
-                continue
-            if character in filtered_solution:
-                pattern[index] = 'Y'
-                index_in_solution = filtered_solution.index(character)
-                filtered_solution[index_in_solution] = ''
-            else:
-                pattern[index] = 'B'
-        return ''.join(pattern)
+        self._count('pattern_lookups')
+        return PATTERNS[self.__pattern_table.code(solution, guess)]
 
     def _compute_guess(self, guess, pattern):
-        '''Updates instance variables based on the given guess and pattern.'''
-        # Handle greens and yellows first
-        yellows_per_character = defaultdict(int)
-        greens_per_character = defaultdict(int)
+        '''Narrows down the candidate words based on the given guess and pattern.'''
+        self.__candidates = self._narrowed_candidates(self.__candidates, guess, pattern)
+        self.__guess_count += 1
+        colored_counts = defaultdict(int)
         for (index, character) in enumerate(guess):
             if pattern[index] == 'G':
-                self.__must_contain.add(character)
-                self.__known_letters[index] = character
-                greens_per_character[character] += 1
-            elif pattern[index] == 'Y':
-                self.__must_contain.add(character)
-                self.__excluded_letters[index].add(character)
-                yellows_per_character[character] += 1
-        # Handle blanks
+                self.__required_letters[index] = character
+            if pattern[index] != 'B':
+                colored_counts[character] += 1
+        for (character, count) in colored_counts.items():
+            self.__required_counts[character] = max(count, self.__required_counts.get(character, 0))
+        if self.__tree_node:
+            if guess == self.__tree_node[0]:
+                code = str(PATTERN_CODES[pattern])
+                self.__tree_pattern_path = '{0},{1}'.format(self.__tree_pattern_path, code) if self.__tree_pattern_path else code
+                self.__tree_node = self.__decision_tree.get(self.__tree_pattern_path)
+            else:
+                self.__tree_node = None
+
+    def _narrowed_candidates(self, candidates, guess, pattern):
+        '''Returns the bitset of the given candidates that match the given guess and pattern.'''
+        if self.__stats:
+            self.__stats.count('filter_calls')
+            self.__stats.count('words_scanned', bin(candidates).count('1'))
+        colored_counts = defaultdict(int)
         characters_with_blanks = set()
         for (index, character) in enumerate(guess):
-            if pattern[index] == 'B':
-                characters_with_blanks.add(character)
-                # If the letter already appeared as a yellow elsewhere in the word,
-                # then it only gets excluded from this index specifically.
-                if yellows_per_character[character] > 0:
-                    self.__excluded_letters[index].add(character)
-                # If the letter already appeared as a green elsewhere in the word,
-                # then it gets excluded from every index apart from the green one(s).
-                elif greens_per_character[character] > 0:
-                    for index2 in range(5):
-                        if self.__known_letters[index2] != character:
-                            self.__excluded_letters[index2].add(character)
+            position_mask = self.__position_masks[index][character]
+            if pattern[index] == 'G':
+                candidates &= position_mask
+                colored_counts[character] += 1
+            else:
+                # Yellows and blanks both rule out the letter at this index.
+                candidates &= ~position_mask
+                if pattern[index] == 'Y':
+                    colored_counts[character] += 1
                 else:
-                    # Otherwise the letter gets excluded from all indices.
-                    for letter_set in self.__excluded_letters:
-                        letter_set.add(character)
-        # Keep track of whether the word should contain multiples of a letter.
-        for character in guess:
-            yellows_and_greens = yellows_per_character[character] + greens_per_character[character]
-            if yellows_and_greens == 1 and character in characters_with_blanks:
-                self.__must_contain_exactly_one.add(character)
-            if yellows_and_greens == 2 and character in characters_with_blanks:
-                self.__must_contain_exactly_two.add(character)
-            if yellows_and_greens > 1:
-                self.__must_contain_two.add(character)
-            if yellows_and_greens > 2:
-                self.__must_contain_three.add(character)
+                    characters_with_blanks.add(character)
+        for character in set(guess):
+            count_masks = self.__count_masks[character]
+            count = colored_counts[character]
+            candidates &= count_masks[count]
+            # A blank means the yellows and greens account for every copy of the letter.
+            if character in characters_with_blanks:
+                candidates &= ~count_masks[count + 1]
+        return candidates
 
     def _suggested_word(self):
         '''Suggest the next word the user should play, based on the results so far.'''
-        filtered_words = self._filtered_words()
-        if len(filtered_words) == 0:
+        if not self.__stats:
+            return self._find_suggested_word()
+        start_time = time.perf_counter()
+        suggestion = self._find_suggested_word()
+        self.__stats.add_time('suggestion', time.perf_counter() - start_time, self.__guess_count + 1)
+        return suggestion
+
+    def _find_suggested_word(self):
+        if self.__candidates == 0:
             return None
+        if self._uses_tree():
+            self._count('tree_hits')
+            return self.__tree_node[0]
+        cache = self.__suggestion_cache
+        if self.__hard_mode:
+            key = cache.key(self.__strategy + ':hard', self.__candidates | (self._hard_mode_mask() << len(self.__guess_words)))
+        else:
+            key = cache.key(self.__strategy, self.__candidates)
+        suggestion = cache.get(key)
+        self._count('cache_hits' if suggestion else 'cache_misses')
+        if suggestion is None:
+            filtered_words = self._filtered_words()
+            if self.__strategy == 'frequency':
+                suggestion = self._frequency_suggestion(filtered_words)
+            else:
+                suggestion = self._partition_suggestion(filtered_words)
+            cache.put(key, suggestion)
+        return suggestion
+
+    def _uses_tree(self):
+        '''Returns True if the next suggestion comes from the decision tree.
+        The tree is skipped in hard mode and for other strategies.'''
+        return bool(self.__tree_node) and not self.__hard_mode and self.__strategy == self.__tree_strategy
+
+    def _suggested_board_word(self, boards):
+        '''Suggest the next word to play on all of the given boards (bitsets of
+        candidates), scoring every board in a single pass over the pattern table.'''
+        # Boards with no candidates left can't be helped.
+        boards = [candidates for candidates in boards if candidates]
+        if not boards:
+            return None
+        # A board with a single candidate left can be solved right away.
+        for candidates in boards:
+            if candidates & (candidates - 1) == 0:
+                return self.__guess_words[candidates.bit_length() - 1]
+        # Boards with the same candidates only need to be scored once.
+        board_weights = defaultdict(int)
+        for candidates in boards:
+            board_weights[candidates] += 1
+        cache = self.__suggestion_cache
+        combined_key = sum(count << (index * 8) for (index, count) in enumerate(board_weights.values()))
+        for (index, candidates) in enumerate(board_weights):
+            combined_key |= candidates << ((index + 1) * len(self.__guess_words) + 64)
+        key = cache.key(self.__strategy + ':boards', combined_key)
+        suggestion = cache.get(key)
+        self._count('cache_hits' if suggestion else 'cache_misses')
+        if suggestion is not None:
+            return suggestion
+        groups = [self._indexes_from_mask(candidates) for candidates in board_weights]
+        columns = np.concatenate(groups)
+        if self.__strategy == 'frequency':
+            union = np.unique(columns)
+            suggestion = self._frequency_suggestion([self.__guess_words[index] for index in union])
+        else:
+            group_ids = np.repeat(np.arange(len(groups)), [len(group) for group in groups])
+            group_weights = np.array(list(board_weights.values()), dtype = np.float64)
+            suggestion = self._best_partition_guess(columns, group_ids, group_weights)
+        cache.put(key, suggestion)
+        return suggestion
+
+    def _frequency_suggestion(self, filtered_words):
+        '''Suggest the remaining word whose letters are the most common
+        among the remaining words.'''
         frequency_dict = defaultdict(float)
         for word in filtered_words:
             for character in word:
@@ -222,35 +965,204 @@ class Wordle():
         word_weights.sort(key = lambda t: t[1], reverse = True)
         return word_weights[0][0]
 
+    def _partition_suggestion(self, filtered_words):
+        '''Suggest the word from the whole word list that best splits the
+        remaining words into patterns, according to the current strategy.'''
+        if len(filtered_words) <= 2:
+            return filtered_words[0]
+        return self._best_partition_guess(self._candidate_indexes())
+
+    def _best_partition_guess(self, columns, group_ids = None, group_weights = None):
+        '''Returns the guess that best splits the candidates at the given
+        column indexes (optionally split into boards), according to the
+        current strategy. In hard mode only guesses that use every hint
+        are considered.'''
+        table = self.__pattern_table
+        if self.__hard_mode:
+            rows = self._indexes_from_mask(self._hard_mode_mask())
+        else:
+            rows = np.arange(len(table.words))
+        if len(rows) * len(columns) > SCORE_PRUNE_ELEMENTS and len(columns) > SCORE_SAMPLE_SIZE:
+            # Keep only the guesses that do best against a sample of the candidates.
+            sample = np.linspace(0, len(columns) - 1, SCORE_SAMPLE_SIZE).astype(np.intp)
+            sample_group_ids = None if group_ids is None else group_ids[sample]
+            sample_scores = table.partition_scores(columns[sample], self.__strategy, sample_group_ids, group_weights, rows)
+            self._count('pattern_reads', len(rows) * len(sample))
+            rows = rows[np.argsort(-sample_scores, kind = 'stable')[:SCORE_SHORTLIST_SIZE]]
+        scores = table.partition_scores(columns, self.__strategy, group_ids, group_weights, rows)
+        self._count('pattern_reads', len(rows) * len(columns))
+        # On a tie, prefer a word that could be the solution.
+        is_candidate = np.isin(rows, columns)
+        return table.words[rows[np.lexsort((~is_candidate, -scores))[0]]]
+
     def _filtered_words(self):
         '''Returns words that match the results of previous guesses.'''
-        return [word for word in self.__word_list if self._filter_word(word)]
+        return [self.__guess_words[index] for index in self._candidate_indexes()]
 
-    def _filter_word(self, word):
-        '''Determines if the given word matches the results of previous guesses.'''
-        for letter in self.__must_contain:
-            if letter not in word:
-                return False
-        for letter in self.__must_contain_two:
-            if word.count(letter) < 2:
-                return False
-        for letter in self.__must_contain_three:
-            if word.count(letter) < 3:
-                return False
-        for letter in self.__must_contain_exactly_one:
-            if word.count(letter) != 1:
-                return False
-        for letter in self.__must_contain_exactly_two:
-            if word.count(letter) != 2:
-                return False
-        for (index, character) in enumerate(word):
-            known_letter = self.__known_letters[index]
-            if known_letter != None and character != known_letter:
-                return False
-            if character in self.__excluded_letters[index]:
-                return False
-        return True
+    def _candidate_indexes(self):
+        '''Returns the word indexes of the remaining candidates as an array.
+        The result is cached until the candidates change.'''
+        (cached_mask, cached_indexes) = self.__candidate_cache
+        if cached_mask != self.__candidates:
+            cached_indexes = self._indexes_from_mask(self.__candidates)
+            self.__candidate_cache = (self.__candidates, cached_indexes)
+        return cached_indexes
+
+    def _indexes_from_mask(self, mask):
+        '''Returns an array of the word indexes of the bits set in the given bitset.'''
+        byte_count = (len(self.__guess_words) + 7) // 8
+        bits = np.unpackbits(np.frombuffer(mask.to_bytes(byte_count, 'little'), dtype = np.uint8), bitorder = 'little')
+        return np.flatnonzero(bits)
+
+# Each worker process in a test pool keeps its own Wordle instance.
+_worker_wordle = None
+
+def _init_worker(cache_path, tree_path, collect_stats):
+    global _worker_wordle
+    _worker_wordle = Wordle(cache_path, collect_stats)
+    _worker_wordle.track_new_suggestions()
+    if tree_path:
+        _worker_wordle.load_tree(tree_path)
+
+def _autoplay_shard(shard):
+    '''Plays every solution in a shard of the word list in a worker process.
+    Also returns the suggestions the worker memoized, so the parent can keep them.'''
+    (words, first_guess, strategy, hard_mode) = shard
+    scores = [(word, _worker_wordle.autoplay(word, first_guess, strategy = strategy, hard_mode = hard_mode)) for word in words]
+    return (scores, _worker_wordle.new_cached_suggestions(), _worker_wordle.take_stats_summary())
+
+def _autoplay_board_shard(shard):
+    '''Plays a shard of multi-board games in a worker process.'''
+    (games, first_guess, strategy) = shard
+    scores = [_worker_wordle.autoplay_boards(game, first_guess, strategy = strategy) for game in games]
+    # The suggestions don't go back to the parent, so don't let them pile up.
+    _worker_wordle.new_cached_suggestions()
+    return (scores, _worker_wordle.take_stats_summary())
+
+def _sweep_first_guess(job):
+    '''Tests a single first guess against every solution.'''
+    (first_guess, strategy) = job
+    score_dict = defaultdict(int)
+    for (_, _, score) in _worker_wordle._test_scores(first_guess, strategy, 1):
+        score_dict[score] += 1
+    # The suggestions don't go back to the parent, so don't let them pile up.
+    _worker_wordle.new_cached_suggestions()
+    game_count = sum(score_dict.values())
+    total_guesses = sum(score * count for (score, count) in score_dict.items() if score != None)
+    return {
+        'first_guess': first_guess,
+        'strategy': strategy,
+        'average': total_guesses / game_count,
+        'failures': score_dict[None],
+        'distribution': {str(score): score_dict[score] for score in range(1, 7)},
+    }
+
+def create_parser():
+    '''Creates and returns the argument parser for this script.'''
+    parser = argparse.ArgumentParser(description = 'Helps you play Wordle.')
+    parser.add_argument('-s', '--strategy', dest = 'strategy', default = STRATEGIES[0], choices = STRATEGIES, help = 'Strategy used to suggest words.')
+    parser.add_argument('-a', '--autoplay', dest = 'solution', default = None, type = str, help = 'Print the suggested guesses for the given solution.')
+    parser.add_argument('-t', '--test', dest = 'test', action = 'store_true', help = 'Test the script against every word in the word list.')
+    parser.add_argument('--hard', dest = 'hard_mode', action = 'store_true', help = 'Play in hard mode, where revealed hints must be used in later guesses.')
+    parser.add_argument('-b', '--boards', dest = 'boards', default = 1, type = int, help = 'Number of boards to solve at once (4 for Quordle, 8 for Octordle). With --autoplay, give one solution per board, separated by commas. With --test, plays --games random games.')
+    parser.add_argument('-g', '--games', dest = 'games', default = 500, type = int, help = 'Number of random games to play for --test with more than one board.')
+    parser.add_argument('-f', '--first-guess', dest = 'first_guess', default = None, type = str, help = 'First guess to use for --autoplay and --test.')
+    parser.add_argument('-j', '--processes', dest = 'processes', default = 1, type = int, help = 'Number of processes to use for --test. Use 0 for one per CPU.')
+    parser.add_argument('--batch', dest = 'batch', default = None, type = str, metavar = 'PATH', help = 'Read JSON game histories from the given file (- for stdin), one per line, and print the remaining word count and suggested guess for each.')
+    parser.add_argument('--sweep', dest = 'sweep', default = None, type = str, metavar = 'PATH', help = 'Test every word as the first guess and append the results to the given JSONL file. Resumes where a previous sweep stopped.')
+    parser.add_argument('--first-guesses', dest = 'first_guesses', default = None, type = str, help = 'Comma-separated first guesses to use for --sweep instead of the whole word list.')
+    parser.add_argument('--build-tree', dest = 'build_tree', default = None, type = str, metavar = 'PATH', help = 'Build a decision tree for --strategy and --first-guess and write it to the given file.')
+    parser.add_argument('--tree', dest = 'tree', default = None, type = str, metavar = 'PATH', help = 'Use the decision tree in the given file for suggestions.')
+    parser.add_argument('--stats', dest = 'stats', action = 'store_true', help = 'Print counters and timings collected while solving as JSON at the end.')
+    parser.add_argument('--profile', dest = 'profile', default = None, choices = ('cprofile', 'tracemalloc'), help = 'Run the command under cProfile or tracemalloc and print a report at the end.')
+    parser.add_argument('--profile-output', dest = 'profile_output', default = None, type = str, metavar = 'PATH', help = 'Write the --profile report to the given file instead of printing it. cProfile reports are written in pstats format.')
+    parser.add_argument('--no-cache', dest = 'use_cache', action = 'store_false', help = 'Don\'t load or save the cache of suggested words.')
+    return parser
+
+def run_command(wordle, args):
+    '''Runs the command selected by the command-line arguments.'''
+    first_guess = args.first_guess.lower() if args.first_guess else None
+    processes = args.processes if args.processes > 0 else os.cpu_count()
+    if args.build_tree:
+        wordle.build_tree(args.build_tree, first_guess, args.strategy)
+    elif args.batch:
+        batch_file = sys.stdin if args.batch == '-' else open(args.batch)
+        with batch_file:
+            for result in wordle.solve_histories(batch_file, args.strategy):
+                print(json.dumps(result), flush = True)
+    elif args.sweep:
+        first_guesses = args.first_guesses.lower().split(',') if args.first_guesses else None
+        try:
+            wordle.sweep(args.sweep, first_guesses, args.strategy, processes)
+        except ValueError as error:
+            print(error)
+    elif args.test and args.boards > 1:
+        wordle.test_boards(args.boards, args.games, 0, first_guess, args.strategy, processes)
+    elif args.test:
+        wordle.test(first_guess, args.strategy, processes, args.hard_mode)
+    elif args.solution and args.boards > 1:
+        solutions = args.solution.lower().split(',')
+        if len(solutions) != args.boards:
+            print('Please enter {0} solutions, separated by commas.'.format(args.boards))
+            return
+        for solution in solutions:
+            if not wordle.is_solution(solution):
+                print('{0} is not an unused word from the word list.'.format(solution))
+                return
+        score = wordle.autoplay_boards(solutions, first_guess, print_guesses = True, strategy = args.strategy)
+        print('Score: {0}'.format('X' if score == None else score))
+    elif args.solution:
+        if not wordle.is_solution(args.solution.lower()):
+            print('{0} is not an unused word from the word list.'.format(args.solution.lower()))
+            return
+        score = wordle.autoplay(args.solution.lower(), first_guess, print_guesses = True, strategy = args.strategy, hard_mode = args.hard_mode)
+        print('Score: {0}'.format('X' if score == None else score))
+    else:
+        wordle.start(args.strategy, args.hard_mode)
+
+def run_profiled(wordle, args):
+    '''Runs the selected command under cProfile or tracemalloc and prints
+    (or writes) the report.'''
+    if args.profile == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.runcall(run_command, wordle, args)
+        if args.profile_output:
+            profiler.dump_stats(args.profile_output)
+        else:
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(30)
+        return
+    tracemalloc.start()
+    run_command(wordle, args)
+    snapshot = tracemalloc.take_snapshot()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    lines = ['Current: {0} bytes, peak: {1} bytes'.format(current, peak)]
+    lines.extend(str(statistic) for statistic in snapshot.statistics('lineno')[:30])
+    if args.profile_output:
+        with open(args.profile_output, 'w') as report_file:
+            report_file.write('\n'.join(lines) + '\n')
+    else:
+        print('\n'.join(lines))
+
+def main():
+    parser = create_parser()
+    args = parser.parse_args()
+    wordle = Wordle(SUGGESTION_CACHE_FILE if args.use_cache else None, args.stats)
+    if args.tree:
+        try:
+            if not wordle.load_tree(args.tree, args.strategy):
+                print('The decision tree in {0} was built from a different word list.'.format(args.tree))
+                return
+        except ValueError as error:
+            print(error)
+            return
+    if args.profile:
+        run_profiled(wordle, args)
+    else:
+        run_command(wordle, args)
+    wordle.save_cache()
+    if args.stats:
+        print(json.dumps(wordle.stats_summary(), indent = 2))
 
 if __name__ == "__main__":
-    wordle = Wordle()
-    wordle.start()
\ No newline at end of file
+    main()
\ No newline at end of file